@@ -0,0 +1,74 @@
+"""
+Measure the memory used by the elements of a statechart, per state and per transition, and the memory
+used by the elements of an imported statechart once it has been exported and executed.
+
+Usage: python benchmarks/model_memory.py [number of elements]
+"""
+import sys
+import tracemalloc
+
+from sismic.interpreter import Interpreter
+from sismic.io import export_to_plantuml, export_to_yaml, import_from_yaml
+from sismic.model import BasicState, CompoundState, Statechart, Transition
+
+
+def measure(factory, nb_elements: int) -> float:
+    """
+    Return the number of bytes allocated per element created by given factory.
+    """
+    tracemalloc.start()
+    elements = [factory(i) for i in range(nb_elements)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Do not count the list holding the elements
+    return (size - sys.getsizeof(elements)) / len(elements)
+
+
+def main(nb_elements: int):
+    names = ['s{}'.format(i) for i in range(nb_elements + 1)]
+
+    def state(i):
+        return BasicState(names[i], on_entry='x += 1')
+
+    def state_with_contract(i):
+        element = BasicState(names[i], on_entry='x += 1')
+        element.invariants.append('x >= 0')
+        return element
+
+    def transition(i):
+        return Transition(names[i], names[i + 1], event='next', guard='x > 10')
+
+    for name, factory in [('state', state), ('state with invariant', state_with_contract), ('transition', transition)]:
+        print('{:22} {:8.1f} bytes'.format(name, measure(factory, nb_elements)))
+
+    # Elements of an imported statechart, after it was used
+    statechart = Statechart('ring')
+    statechart.add_state(CompoundState('root', initial=names[0]), None)
+    nb_states = nb_elements // 10
+    for i in range(nb_states):
+        statechart.add_state(BasicState(names[i], on_entry='x = 1'), 'root')
+    for i in range(nb_states):
+        statechart.add_transition(Transition(names[i], names[(i + 1) % nb_states], event='next'))
+    text = export_to_yaml(statechart)
+
+    tracemalloc.start()
+    statechart = import_from_yaml(text)
+    nb_chart_elements = len(statechart.states) + len(statechart.transitions)
+    previous, _ = tracemalloc.get_traced_memory()
+    print('{:22} {:8.1f} bytes'.format('imported element', previous / nb_chart_elements))
+
+    interpreter = Interpreter(statechart)
+    for step, operation in [
+            ('exported', lambda: (export_to_yaml(statechart), export_to_plantuml(statechart), statechart.fingerprint())),
+            ('executed', lambda: interpreter.queue(*['next'] * 100).execute()),
+            ('frozen', statechart.freeze)]:
+        operation()
+        size, _ = tracemalloc.get_traced_memory()
+        print('{:22} {:+8.1f} bytes'.format(step, (size - previous) / nb_chart_elements))
+        previous = size
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,28 @@
+"""
+Measure sismic.io.export_to_dict and sismic.io.export_to_yaml on large synthetic statecharts.
+The time per state should remain roughly constant as the number of states grows.
+
+Usage: python benchmarks/yaml_export.py [number of states ...]
+"""
+import sys
+import timeit
+
+from sismic.io import export_to_yaml
+from sismic.io.datadict import export_to_dict
+
+from yaml_import import synthetic_statechart
+
+
+def main(sizes):
+    for size in sizes:
+        statechart = synthetic_statechart(size)
+        nb_states = len(statechart.states)
+        print('{} states'.format(nb_states))
+        for function in (export_to_dict, export_to_yaml):
+            duration = min(timeit.repeat(lambda: function(statechart), number=1, repeat=3))
+            print('  {:15}  {:8.3f}s  {:8.2f}us/state'.format(
+                function.__name__, duration, duration / nb_states * 1000000))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,51 @@
+"""
+Compare the default and the fast paths of sismic.io.import_from_yaml on large synthetic statecharts.
+
+Usage: python benchmarks/yaml_import.py [number of states ...]
+"""
+import sys
+import timeit
+
+from sismic.io import export_to_yaml, import_from_yaml
+from sismic.model import CompoundState, BasicState, Statechart, Transition
+
+
+def synthetic_statechart(nb_states: int, width: int=10) -> Statechart:
+    """
+    Return a statechart with (approximately) given number of states, organized in compound
+    states of given width. Each basic state has two transitions.
+    """
+    statechart = Statechart('synthetic', preamble='x = 0')
+    statechart.add_state(CompoundState('root', initial='c0'), None)
+
+    nb_compounds = nb_states // width
+
+    for i in range(nb_compounds):
+        compound = 'c{}'.format(i)
+        statechart.add_state(CompoundState(compound, initial='{}_0'.format(compound)), 'root')
+        for j in range(width - 1):
+            state = BasicState('{}_{}'.format(compound, j), on_entry='x += 1')
+            state.invariants.append('x >= 0')
+            statechart.add_state(state, compound)
+
+    for i in range(nb_compounds):
+        compound = 'c{}'.format(i)
+        for j in range(width - 1):
+            name = '{}_{}'.format(compound, j)
+            statechart.add_transition(Transition(name, '{}_{}'.format(compound, (j + 1) % (width - 1)), event='next'))
+            statechart.add_transition(Transition(name, 'c{}'.format((i + 1) % nb_compounds), guard='x > 10'))
+
+    return statechart
+
+
+def main(sizes):
+    for size in sizes:
+        text = export_to_yaml(synthetic_statechart(size))
+        print('{} states, {:.1f} KB'.format(size, len(text) / 1024))
+        for fast in (False, True):
+            duration = min(timeit.repeat(lambda: import_from_yaml(text, fast=fast), number=1, repeat=3))
+            print('  fast={!s:5}  {:8.3f}s'.format(fast, duration))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
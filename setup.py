@@ -51,6 +51,9 @@ setup(
         'schema>=0.6.2',
         'behave>=1.2.6',
     ],
+    extras_require={
+        'msgpack': ['msgpack>=0.6'],
+    },
 
     entry_points={
         'console_scripts': [
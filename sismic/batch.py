@@ -0,0 +1,231 @@
+import os
+import pickle
+import sys
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .exceptions import ContractError
+from .helpers import log_trace
+from .interpreter import Interpreter
+from .io import import_from_yaml
+from .model import Event, Statechart
+
+__all__ = ['ScriptResult', 'run_scripts']
+
+
+ScriptItem = Union[str, Event, Tuple[float, Union[str, Event]]]
+
+
+class ScriptResult:
+    """
+    Compact result of the execution of an event script.
+
+    Transitions are identified by their position in the list of transitions
+    of the statechart (see *Statechart.transitions*).
+
+    :param configuration: the final configuration.
+    :param entered_states: number of times each state was entered.
+    :param exited_states: number of times each state was exited.
+    :param processed_transitions: number of times each transition was processed.
+    :param violation: a triple (exception class name, object, condition) if a contract was violated, None otherwise.
+    """
+
+    __slots__ = ['configuration', 'entered_states', 'exited_states', 'processed_transitions', 'violation']
+
+    def __init__(self, configuration: List[str], entered_states: Counter, exited_states: Counter,
+                 processed_transitions: Counter, violation: Tuple[str, str, str]=None) -> None:
+        self.configuration = configuration
+        self.entered_states = entered_states
+        self.exited_states = exited_states
+        self.processed_transitions = processed_transitions
+        self.violation = violation
+
+    def __getstate__(self):
+        # For pickle and implicitly for multiprocessing
+        return (self.configuration, self.entered_states, self.exited_states,
+                self.processed_transitions, self.violation)
+
+    def __setstate__(self, state):
+        # For pickle and implicitly for multiprocessing
+        (self.configuration, self.entered_states, self.exited_states,
+         self.processed_transitions, self.violation) = state
+
+    def __repr__(self):
+        return '{}({!r}, violation={!r})'.format(self.__class__.__name__, self.configuration, self.violation)
+
+
+# State of a worker process, set once by _initialize_worker
+_worker = {}  # type: Dict[str, Any]
+
+
+def _initialize_worker(data: bytes) -> None:
+    """
+    Load the statechart (and interpreter factory) that will be used by current worker.
+
+    :param data: pickled statechart and interpreter factory
+    """
+    statechart, interpreter_klass = pickle.loads(data)
+    _worker['statechart'] = statechart
+    _worker['interpreter_klass'] = interpreter_klass
+    _worker['transitions'] = {t.id: i for i, t in enumerate(statechart.transitions)}
+
+
+def _run_script(script: Iterable[ScriptItem]) -> ScriptResult:
+    """
+    Execute given event script in current worker.
+
+    :param script: an event script
+    :return: the result of the execution
+    """
+    interpreter = _worker['interpreter_klass'](_worker['statechart'])
+    trace = log_trace(interpreter)
+    violation = None
+
+    try:
+        interpreter.execute()
+        for item in script:
+            if isinstance(item, tuple):
+                time, item = item
+                interpreter.clock.time = time
+            interpreter.queue(item)
+            interpreter.execute()
+    except ContractError as e:
+        violation = (e.__class__.__name__, str(e.obj), e.condition)
+
+    transitions = _worker['transitions']
+    entered_states = Counter()  # type: Counter
+    exited_states = Counter()  # type: Counter
+    processed_transitions = Counter()  # type: Counter
+
+    for macro_step in trace:
+        for step in macro_step.steps:
+            entered_states.update(step.entered_states)
+            exited_states.update(step.exited_states)
+            if step.transition is not None:
+                processed_transitions[transitions[step.transition.id]] += 1
+
+    return ScriptResult(
+        configuration=interpreter.configuration,
+        entered_states=entered_states,
+        exited_states=exited_states,
+        processed_transitions=processed_transitions,
+        violation=violation,
+    )
+
+
+def _run_chunk(scripts: List[Iterable[ScriptItem]], data: bytes=None) -> List[ScriptResult]:
+    """
+    Execute given event scripts in current worker.
+
+    :param scripts: a list of event scripts
+    :param data: pickled statechart and interpreter factory, if the worker was not initialized
+    :return: the results of the executions
+    """
+    if data is not None:
+        _initialize_worker(data)
+    return [_run_script(script) for script in scripts]
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def _completed_chunks(executor: ProcessPoolExecutor, chunks: Iterator[List], data: Optional[bytes],
+                      window: int) -> Iterator[Tuple[int, List[ScriptResult]]]:
+    """
+    Submit given chunks of scripts to the executor, with at most *window* pending chunks at once,
+    and yield their results as soon as they are available.
+
+    :param executor: the pool of processes
+    :param chunks: an iterator over chunks of scripts
+    :param data: pickled statechart and interpreter factory, if workers are not initialized
+    :param window: maximum number of pending chunks
+    :return: an iterator over pairs (position of the chunk, results of the chunk)
+    """
+    pending = {}  # type: Dict[Future, int]
+    for position, chunk in enumerate(chunks):
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+        pending[executor.submit(_run_chunk, chunk, data)] = position
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+
+def run_scripts(statechart: Union[Statechart, str],
+                scripts: Iterable[Iterable[ScriptItem]],
+                reducer: Callable[[Any, ScriptResult], Any]=None,
+                initial: Any=None, *,
+                interpreter_klass: Callable[[Statechart], Interpreter]=None,
+                max_workers: int=None,
+                chunksize: int=16) -> Any:
+    """
+    Execute a statechart against many independent event scripts, using a pool of processes.
+
+    Each script is executed by a fresh interpreter. A script is an iterable whose items are either events
+    (names or *Event* instances), or pairs *(time, event)*. Each event is queued and the interpreter is
+    executed until it is stable. If a time is provided, the clock of the interpreter is set to this value
+    before the event is queued. The execution of a script stops as soon as a contract is violated.
+
+    The statechart is sent only once to each worker process. Scripts are consumed lazily: at most twice as
+    many chunks as worker processes are pending at once. The results of the executions are streamed
+    back to the current process as soon as they are available, and combined using *reducer*: a callable
+    that accepts the current accumulated value (initially *initial*) and a *ScriptResult* instance, and
+    returns a new accumulated value. Notice that results are not necessarily combined in the order of the
+    scripts. If no reducer is provided, the list of results is returned, in the order of the scripts.
+
+    Scripts and the interpreter factory must be picklable. The reducer is called in the current process.
+    Notice that the statechart is sent along with each chunk of scripts on Python < 3.7.
+
+    :param statechart: a statechart, or a path to a YAML file
+    :param scripts: an iterable of event scripts
+    :param reducer: an optional callable to combine the results
+    :param initial: initial value for the reducer
+    :param interpreter_klass: An optional callable that accepts a statechart and returns an *Interpreter* instance.
+        Default to Interpreter.
+    :param max_workers: maximum number of worker processes, default to the number of processors
+    :param chunksize: number of scripts that are sent at once to a worker process
+    :return: the accumulated value, or a list of *ScriptResult* instances if no reducer is provided.
+    """
+    if isinstance(statechart, str):
+        statechart = import_from_yaml(filepath=statechart)
+
+    interpreter_klass = Interpreter if interpreter_klass is None else interpreter_klass
+    data = pickle.dumps((statechart, interpreter_klass), protocol=pickle.HIGHEST_PROTOCOL)
+
+    if sys.version_info >= (3, 7):
+        executor = ProcessPoolExecutor(max_workers, initializer=_initialize_worker, initargs=(data,))
+        chunk_data = None  # type: Optional[bytes]
+    else:  # pragma: no cover
+        executor = ProcessPoolExecutor(max_workers)
+        chunk_data = data
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    window = 2 * max_workers
+    accumulated = initial
+    ordered_results = {}  # type: Dict[int, List[ScriptResult]]
+
+    with executor:
+        chunks = _chunks(scripts, chunksize)
+        for position, chunk_results in _completed_chunks(executor, chunks, chunk_data, window):
+            if reducer is None:
+                ordered_results[position] = chunk_results
+            else:
+                for result in chunk_results:
+                    accumulated = reducer(accumulated, result)
+
+    if reducer is None:
+        return [result for position in sorted(ordered_results) for result in ordered_results[position]]
+    return accumulated
@@ -22,16 +22,18 @@ def cli(args=None) -> int:
                         help='Display a list of available steps (equivalent to Behave\'s --steps parameter')
     parser.add_argument('--debug-on-error', action='store_true', default=False,
                         help='Drop in a debugger in case of step failure (ipdb if available)')
+    parser.add_argument('--cache-dir', metavar='cache_dir', type=str, default=None,
+                        help='A directory used to cache the parsed statecharts')
 
     args, parameters = parser.parse_known_args(args)
     if args.show_steps:
         parameters.append('--steps')
 
-    statechart = import_from_yaml(filepath=args.statechart)
+    statechart = import_from_yaml(filepath=args.statechart, cache_dir=args.cache_dir)
 
     property_statecharts = []
     for property_statechart in args.properties or []:
-        property_statecharts.append(import_from_yaml(filepath=property_statechart))
+        property_statecharts.append(import_from_yaml(filepath=property_statechart, cache_dir=args.cache_dir))
 
     return execute_bdd(
         statechart,
@@ -1,5 +1,7 @@
 import abc
-from typing import Any, Optional, Iterable, List, Mapping
+import copy
+
+from typing import Any, Optional, Iterable, List, Mapping, Tuple
 
 from ..model import Statechart, StateMixin, Transition, Event
 from ..exceptions import CodeEvaluationError
@@ -60,6 +62,34 @@ class Evaluator(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    def time_constraints(self, code: Optional[str]) -> Optional[List[Tuple[str, float]]]:
+        """
+        Return the time constraints on which the truth value of given code depends.
+
+        A time constraint is a pair *(predicate, seconds)* where *predicate* is either "after" or "idle".
+        It means that the truth value of the code could change as soon as the source state has been entered
+        (for "after") or has not fired a transition (for "idle") for *seconds* seconds.
+        These constraints are used by *Interpreter.simulate_until* to compute the next point in time at which
+        a transition could be triggered.
+
+        By default, the time constraints of any non-empty code are unknown.
+
+        :param code: code to consider
+        :return: a possibly empty list of time constraints, or None if they cannot be determined.
+        """
+        return [] if code is None else None
+
+    def fork(self, interpreter) -> 'Evaluator':
+        """
+        Return a copy of this evaluator for given interpreter, as used by *Interpreter.fork*.
+
+        By default, a new instance is created with a deep copy of current context.
+
+        :param interpreter: the interpreter that will use the copy
+        :return: an evaluator
+        """
+        return self.__class__(interpreter, initial_context=copy.deepcopy(dict(self.context)))
+
     def execute_statechart(self, statechart: Statechart):
         """
         Execute the initial code of a statechart.
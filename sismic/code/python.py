@@ -1,8 +1,9 @@
+import ast
 import collections
 import copy
 
 from types import CodeType
-from typing import Any, Dict, List, Optional, Mapping, Iterator
+from typing import Any, Dict, FrozenSet, List, Optional, Mapping, Iterator, Set, Tuple, cast
 
 from . import Evaluator
 from ..exceptions import CodeEvaluationError
@@ -44,6 +45,189 @@ class FrozenContext(collections.Mapping):
         return iter(self.__frozencontext)
 
 
+class TrackedContext(dict):
+    """
+    A dictionary that keeps track of the changes made to its keys.
+
+    Each change increases a version number. The version at which a key was
+    last changed is available through *version_for*.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self._versions = {}  # type: Dict[str, int]
+
+    def version_for(self, key: str) -> int:
+        """
+        Return the version at which given key was last changed.
+
+        :param key: a key
+        :return: a version number, 0 if the key was never changed.
+        """
+        return self._versions.get(key, 0)
+
+    def __reduce__(self):
+        # For pickle, as items are otherwise restored before attributes
+        return self.__class__, (dict(self),), self.__dict__
+
+    def copy(self) -> 'TrackedContext':
+        """
+        Return a shallow copy of this context, including its versions.
+        """
+        context = self.__class__(self)
+        context.version = self.version
+        context._versions = self._versions.copy()
+        return context
+
+    __copy__ = copy
+
+    def _touch(self, key: str) -> None:
+        self.version += 1
+        self._versions[key] = self.version
+
+    def __setitem__(self, key, value):
+        self._touch(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._touch(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        if key in self:
+            self._touch(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._touch(key)
+        return key, value
+
+    def clear(self):
+        for key in self:
+            self._touch(key)
+        super().clear()
+
+
+class Context(dict):
+    """
+    Default context of a *PythonEvaluator*.
+    """
+
+
+# Types of the values that are never copied when a context is forked
+_IMMUTABLE_TYPES = (bool, int, float, complex, str, bytes, type(None), frozenset, range)
+
+
+class _SharedValues:
+    """
+    Mixin for a context that shares values with other contexts (see *PythonEvaluator.fork*).
+
+    The mutable values that are shared are deep-copied the first time they are accessed, so that
+    neither the changes made to these values nor to their nested values are visible from the other
+    contexts. The keys of these values are stored in *_shared_keys*.
+    """
+
+    __slots__ = ()
+
+    def _shared(self) -> Set[str]:
+        return self.__dict__.setdefault('_shared_keys', set())
+
+    def _copy_shared(self, key) -> None:
+        shared = self._shared()
+        if key in shared:
+            shared.remove(key)
+            dict.__setitem__(self, key, copy.deepcopy(dict.__getitem__(self, key)))
+
+    def _copy_all_shared(self) -> None:
+        for key in list(self._shared()):
+            self._copy_shared(key)
+
+    def _fork(self) -> Dict[str, Any]:
+        """
+        Return a copy of this context that shares its values with this context.
+        """
+        shared = self._shared()
+        shared.update(key for key, value in dict.items(self) if not isinstance(value, _IMMUTABLE_TYPES))
+
+        context = dict.__new__(type(self))
+        dict.update(context, self)
+        context.__dict__.update((key, copy.copy(value)) for key, value in self.__dict__.items())
+        return context
+
+    def __getitem__(self, key):
+        self._copy_shared(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._copy_shared(key)
+        return dict.get(self, key, default)
+
+    def setdefault(self, key, default=None):
+        self._copy_shared(key)
+        return super().setdefault(key, default)
+
+    def items(self):
+        self._copy_all_shared()
+        return dict.items(self)
+
+    def values(self):
+        self._copy_all_shared()
+        return dict.values(self)
+
+    def copy(self):
+        self._copy_all_shared()
+        return super().copy()
+
+    __copy__ = copy
+
+    def __setitem__(self, key, value):
+        self._shared().discard(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._shared().discard(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self._copy_shared(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self._copy_all_shared()
+        return super().popitem()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self._shared().clear()
+        super().clear()
+
+
+class _SharedContext(_SharedValues, Context):
+    pass
+
+
+class _SharedTrackedContext(_SharedValues, TrackedContext):
+    pass
+
+
+# Classes of the contexts that share values, by class of context
+_SHARED_CONTEXTS = {Context: _SharedContext, TrackedContext: _SharedTrackedContext}
+
+
 class PythonEvaluator(Evaluator):
     """
     A code evaluator that understands Python.
@@ -85,16 +269,38 @@ class PythonEvaluator(Evaluator):
     If an exception occurred while executing or evaluating a piece of code, it is propagated by the
     evaluator.
 
+    If *cache_guards* is set, the changes made to the context are tracked, and the guard of an eventless
+    transition that evaluated to False is not evaluated again until one of the variables it reads is changed.
+    Guards that rely on *time*, *after*, *idle* or *active* are always evaluated.
+    This assumes that guards are side-effect free and only depend on the variables they read, and that
+    the values of these variables are not mutated in place (e.g., *x.append(1)* is not tracked
+    while *x = x + [1]* is).
+
     :param interpreter: the interpreter that will use this evaluator,
         is expected to be an *Interpreter* instance
     :param initial_context: a dictionary that will be used as *__locals__*
+    :param cache_guards: set to True to avoid re-evaluating unchanged eventless guards.
     """
-    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any]=None) -> None:
+
+    # Names whose value could change without the context being changed
+    VOLATILE_NAMES = frozenset(['time', 'after', 'idle', 'active'])
+
+    # Code compiled ahead of time, shared by all instances (see add_compiled_code)
+    _compiled_evaluable_code = {}  # type: Dict[str, CodeType]
+    _compiled_executable_code = {}  # type: Dict[str, CodeType]
+
+    def __init__(self, interpreter=None, *, initial_context: Mapping[str, Any]=None, cache_guards: bool=False) -> None:
         super().__init__(interpreter, initial_context=initial_context)
 
-        self._context = {}  # type: Dict[str, Any]
+        self._context = TrackedContext() if cache_guards else Context()  # type: Dict[str, Any]
         self._context.update(initial_context if initial_context else {})
         self._interpreter = interpreter
+        self._cache_guards = cache_guards
+
+        # Names read by guards (None if guard depends on a volatile name)
+        self._guard_names = {}  # type: Dict[str, Optional[FrozenSet[str]]]
+        # Version of the context when a guard was evaluated to False
+        self._false_guards = {}  # type: Dict[str, int]
 
         # Precompiled code
         self._evaluable_code = {}  # type: Dict[str, CodeType]
@@ -103,10 +309,55 @@ class PythonEvaluator(Evaluator):
         # Frozen context for __old__
         self._memory = {}  # type: Dict[int, FrozenContext]
 
+        # Time constraints of code
+        self._time_constraints = {}  # type: Dict[str, Optional[List[Tuple[str, float]]]]
+
     @property
     def context(self) -> Mapping:
         return self._context
 
+    @classmethod
+    def add_compiled_code(cls, evaluable: Mapping[str, CodeType], executable: Mapping[str, CodeType]) -> None:
+        """
+        Register code that was compiled ahead of time (e.g. by *sismic.io.bundle*), so that
+        evaluators do not need to compile it. Registered code is shared by all instances.
+
+        :param evaluable: a mapping from code to the result of *compile(code, '<string>', 'eval')*
+        :param executable: a mapping from code to the result of *compile(code, '<string>', 'exec')*
+        """
+        PythonEvaluator._compiled_evaluable_code.update(evaluable)
+        PythonEvaluator._compiled_executable_code.update(executable)
+
+    def fork(self, interpreter) -> 'PythonEvaluator':
+        """
+        Return a copy of this evaluator for given interpreter.
+
+        Compiled code is shared with the copy. The values of the context are shared with the copy
+        until they are accessed: a mutable value is deep-copied the first time it is accessed from either
+        context, so that forking does not depend on the size of the values, and that the changes made to
+        these values (including nested values) are not visible from the other context.
+
+        :param interpreter: the interpreter that will use the copy
+        :return: an evaluator
+        """
+        evaluator = self.__class__.__new__(self.__class__)
+        evaluator.__dict__.update(self.__dict__)
+        evaluator._interpreter = interpreter
+
+        context = self._context
+        if not isinstance(context, _SharedValues):
+            if type(context) in _SHARED_CONTEXTS:
+                context.__class__ = _SHARED_CONTEXTS[type(context)]
+            else:
+                # Unknown class of context, values are copied eagerly
+                evaluator._context = copy.deepcopy(context)
+        if isinstance(context, _SharedValues):
+            evaluator._context = context._fork()
+
+        evaluator._false_guards = self._false_guards.copy()
+        evaluator._memory = self._memory.copy()
+        return evaluator
+
     def _setdefault(self, name: str, value: Any) -> Any:
         """
         Define and return variable "name".
@@ -117,6 +368,68 @@ class PythonEvaluator(Evaluator):
         """
         return self._context.setdefault(name, value)
 
+    def time_constraints(self, code: Optional[str]) -> Optional[List[Tuple[str, float]]]:
+        """
+        Return the time constraints on which the truth value of given code depends.
+
+        The constraints are statically extracted from the calls to *after* and *idle* whose
+        parameter is a numeric literal. If *time* is used, or if *after* or *idle* are used
+        in any other way, the time constraints are unknown.
+
+        :param code: code to consider
+        :return: a possibly empty list of time constraints, or None if they cannot be determined.
+        """
+        if code is None:
+            return []
+
+        try:
+            return self._time_constraints[code]
+        except KeyError:
+            pass
+
+        constraints = []  # type: Optional[List[Tuple[str, float]]]
+        supported_names = set()  # Names involved in supported calls to after and idle
+
+        nodes = list(ast.walk(ast.parse(code, '<string>', 'exec')))
+        for node in nodes:
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('after', 'idle')
+                    and len(node.args) == 1 and len(node.keywords) == 0):
+                try:
+                    seconds = ast.literal_eval(node.args[0])
+                except ValueError:
+                    continue
+                if isinstance(seconds, (int, float)) and not isinstance(seconds, bool):
+                    constraints.append((node.func.id, seconds))
+                    supported_names.add(node.func)
+
+        for node in nodes:
+            if isinstance(node, ast.Name) and node.id in ('time', 'after', 'idle') and node not in supported_names:
+                constraints = None
+                break
+
+        return self._time_constraints.setdefault(code, constraints)
+
+    def _compile(self, code: str, mode: str) -> CodeType:
+        """
+        Return the compiled version of given code.
+
+        :param code: code to compile
+        :param mode: either 'eval' or 'exec'
+        :return: a code object
+        """
+        if mode == 'eval':
+            cache, compiled = self._evaluable_code, PythonEvaluator._compiled_evaluable_code
+        else:
+            cache, compiled = self._executable_code, PythonEvaluator._compiled_executable_code
+
+        compiled_code = cache.get(code, None)
+        if compiled_code is None:
+            compiled_code = compiled.get(code, None)
+            if compiled_code is None:
+                compiled_code = compile(code, '<string>', mode)
+            cache[code] = compiled_code
+        return compiled_code
+
     def _evaluate_code(self, code: Optional[str], *, additional_context: Mapping[str, Any]=None) -> bool:
         """
         Evaluate given code using Python.
@@ -128,9 +441,7 @@ class PythonEvaluator(Evaluator):
         if code is None:
             return True
 
-        compiled_code = self._evaluable_code.get(code, None)
-        if compiled_code is None:
-            compiled_code = self._evaluable_code.setdefault(code, compile(code, '<string>', 'eval'))
+        compiled_code = self._compile(code, 'eval')
 
         exposed_context = {
             'active': lambda s: s in self._interpreter.configuration,
@@ -155,9 +466,7 @@ class PythonEvaluator(Evaluator):
         if code is None:
             return []
 
-        compiled_code = self._executable_code.get(code, None)
-        if compiled_code is None:
-            compiled_code = self._executable_code.setdefault(code, compile(code, '<string>', 'exec'))
+        compiled_code = self._compile(code, 'exec')
 
         sent_events = []  # type: List[Event]
 
@@ -176,6 +485,30 @@ class PythonEvaluator(Evaluator):
         except Exception as e:
             raise CodeEvaluationError('"{}" occurred while executing "{}"'.format(e, code)) from e
 
+    def _names_for(self, code: str) -> Optional[FrozenSet[str]]:
+        """
+        Return the names that are read by given code, or None if it reads a volatile name.
+
+        :param code: code to consider
+        :return: a set of names or None
+        """
+        try:
+            return self._guard_names[code]
+        except KeyError:
+            pass
+
+        compiled_code = self._compile(code, 'eval')
+
+        names = set()  # type: Set[str]
+        code_objects = [compiled_code]
+        while code_objects:
+            code_object = code_objects.pop()
+            names.update(code_object.co_names)
+            code_objects.extend(c for c in code_object.co_consts if isinstance(c, CodeType))
+
+        result = None if names & self.VOLATILE_NAMES else frozenset(names)
+        return self._guard_names.setdefault(code, result)
+
     def evaluate_guard(self, transition: Transition, event: Optional[Event]=None) -> bool:
         """
         Evaluate the guard for given transition.
@@ -184,12 +517,32 @@ class PythonEvaluator(Evaluator):
         :param event: instance of *Event* if any
         :return: truth value of *code*
         """
+        code = getattr(transition, 'guard', None)
         additional_context = {
-            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter._entry_time[transition.source],
-            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter._idle_time[transition.source],
+            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter.entry_time_for(transition.source),
+            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter.idle_time_for(transition.source),
             'event': event,
         }
-        return self._evaluate_code(getattr(transition, 'guard', None), additional_context=additional_context)
+
+        if not self._cache_guards or event is not None or code is None:
+            return self._evaluate_code(code, additional_context=additional_context)
+
+        names = self._names_for(code)
+        if names is None:
+            return self._evaluate_code(code, additional_context=additional_context)
+
+        context = cast(TrackedContext, self._context)
+        version = self._false_guards.get(code, None)
+        if version is not None and all(context.version_for(name) <= version for name in names):
+            return False
+
+        version = context.version
+        if self._evaluate_code(code, additional_context=additional_context):
+            self._false_guards.pop(code, None)
+            return True
+        else:
+            self._false_guards[code] = version
+            return False
 
     def evaluate_preconditions(self, obj, event: Optional[Event]=None) -> Iterator[str]:
         """
@@ -228,8 +581,8 @@ class PythonEvaluator(Evaluator):
 
         additional_context = {
             '__old__': self._memory.get(id(obj), None),
-            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter._entry_time[state_name],
-            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter._idle_time[state_name],
+            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter.entry_time_for(state_name),
+            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter.idle_time_for(state_name),
             'received': lambda name: name == getattr(event, 'name', None),
             'sent': lambda name: name in [e.name for e in self._interpreter._sent_events],
             'event': event,
@@ -253,8 +606,8 @@ class PythonEvaluator(Evaluator):
 
         additional_context = {
             '__old__': self._memory.get(id(obj), None),
-            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter._entry_time[state_name],
-            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter._idle_time[state_name],
+            'after': lambda seconds: self._interpreter.time - seconds >= self._interpreter.entry_time_for(state_name),
+            'idle': lambda seconds: self._interpreter.time - seconds >= self._interpreter.idle_time_for(state_name),
             'received': lambda name: name == getattr(event, 'name', None),
             'sent': lambda name: name in [e.name for e in self._interpreter._sent_events],
             'event': event,
@@ -4,10 +4,10 @@ import warnings
 
 from collections import Counter
 from functools import wraps
-from typing import Any, Callable, List, Mapping
+from typing import Any, Callable, Dict, List, Mapping
 
 from .interpreter import Interpreter
-from .model import MacroStep
+from .model import MacroStep, Transition
 
 __all__ = ['log_trace', 'run_in_background', 'coverage_from_trace']
 
@@ -44,19 +44,28 @@ def coverage_from_trace(trace: List[MacroStep]) -> Mapping[str, Counter]:
     """
     entered_states = []
     exited_states = []
-    processed_transitions = []
+    processed_transitions = Counter()  # type: Counter
+    transitions = {}  # type: Dict[Any, Transition]
 
     for macrostep in trace:
         for microstep in macrostep.steps:
             entered_states.extend(microstep.entered_states)
             exited_states.extend(microstep.exited_states)
-            if microstep.transition:
-                processed_transitions.append(microstep.transition)
+            transition = microstep.transition
+            if transition:
+                # Count transitions by identifier, unless they are not part of a statechart
+                key = transition if transition.id is None else transition.id
+                processed_transitions[key] += 1
+                transitions[key] = transition
+
+    counter = Counter()  # type: Counter
+    for key, n in processed_transitions.items():
+        counter[transitions[key]] += n
 
     return {
         'entered states': Counter(entered_states),
         'exited states': Counter(exited_states),
-        'processed transitions': Counter(processed_transitions)
+        'processed transitions': counter,
     }
 
 
@@ -1,4 +1,7 @@
 import bisect
+import copy
+import pickle
+import sys
 import warnings
 
 from itertools import combinations
@@ -9,9 +12,9 @@ from .listener import InternalEventListener, PropertyStatechartListener
 from ..utilities import sorted_groupby
 from ..clock import Clock, SimulatedClock, SynchronizedClock
 from ..code import Evaluator, PythonEvaluator
-from ..exceptions import (ConflictingTransitionsError, InvariantError,
-                          NonDeterminismError, PostconditionError,
-                          PreconditionError)
+from ..exceptions import (ConflictingTransitionsError, ExecutionError,
+                          InvariantError, NonDeterminismError,
+                          PostconditionError, PreconditionError)
 from ..model import (CompoundState, DeepHistoryState, Event,
                      FinalState, InternalEvent, MacroStep, MetaEvent,
                      MicroStep, OrthogonalState, ShallowHistoryState,
@@ -20,6 +23,10 @@ from ..model import (CompoundState, DeepHistoryState, Event,
 __all__ = ['Interpreter']
 
 
+# Version of the format used by Interpreter.snapshot
+_SNAPSHOT_VERSION = 2
+
+
 class _KeyifyList():
     def __init__(self, inner, key):
         self.inner = inner
@@ -32,6 +39,17 @@ class _KeyifyList():
         return self.key(self.inner[k])
 
 
+def _earliest_time(reference: float, seconds: float) -> float:
+    """
+    Return the earliest time value t such that *t - seconds >= reference* holds, taking
+    floating-point arithmetic into account.
+    """
+    time = reference + seconds
+    while time - seconds < reference:
+        time += max(abs(time), 1) * sys.float_info.epsilon
+    return time
+
+
 class Interpreter:
     """
     A discrete interpreter that executes a statechart according to a semantic close to SCXML
@@ -46,17 +64,25 @@ class Interpreter:
     :param clock: A BaseClock instance that will be used to set this interpreter internal time.
         By default, a SimulatedClock is used.
     :param ignore_contract: set to True to ignore contract checking during the execution.
+    :param lazy_invariants: set to True to skip the evaluation of state invariants that do not depend
+        on time (see *Evaluator.time_constraints*) when no step is processed. This assumes that the
+        context is not changed outside of the execution of the statechart.
     """
 
     def __init__(self, statechart: Statechart, *,
                  evaluator_klass: Callable[..., Evaluator]=PythonEvaluator,
                  initial_context: Mapping[str, Any]=None,
                  clock: Clock=None,
-                 ignore_contract: bool=False) -> None:
+                 ignore_contract: bool=False,
+                 lazy_invariants: bool=False) -> None:
         # Internal variables
         self._ignore_contract = ignore_contract
+        self._lazy_invariants = lazy_invariants
         self._statechart = statechart
 
+        # Invariants (by code) whose truth value depends on time
+        self._time_dependent_invariants = {}  # type: Dict[str, bool]
+
         self._initialized = False
 
         # Internal clock
@@ -69,7 +95,7 @@ class Interpreter:
         # Set of active states
         self._configuration = set()  # type: Set[str]
 
-        # Entry and idle times
+        # Entry and idle times of states that were entered
         self._entry_time = dict()  # type: Dict[str, float]
         self._idle_time = dict()  # type: Dict[str, float]
 
@@ -107,6 +133,35 @@ class Interpreter:
         """
         return sorted(self._configuration, key=lambda s: (self._statechart.depth_for(s), s))
 
+    def entry_time_for(self, name: str) -> Optional[float]:
+        """
+        Return the time at which given state was entered for the last time.
+
+        :param name: name of a state
+        :return: entry time, or None if the state was never entered
+        :raise StatechartError: if state does not exist
+        """
+        try:
+            return self._entry_time[name]
+        except KeyError:
+            self._statechart.state_for(name)  # Raise StatechartError if state does not exist
+            return None
+
+    def idle_time_for(self, name: str) -> Optional[float]:
+        """
+        Return the time since which given state is idle, i.e. the time at which it was entered or
+        at which one of its transitions was processed for the last time.
+
+        :param name: name of a state
+        :return: idle time, or None if the state was never entered
+        :raise StatechartError: if state does not exist
+        """
+        try:
+            return self._idle_time[name]
+        except KeyError:
+            self._statechart.state_for(name)  # Raise StatechartError if state does not exist
+            return None
+
     @property
     def context(self) -> Mapping[str, Any]:
         """
@@ -128,6 +183,113 @@ class Interpreter:
         """
         return self._statechart
 
+    def fork(self) -> 'Interpreter':
+        """
+        Return an independent copy of this interpreter, e.g. to explore alternative executions
+        from its current state.
+
+        The statechart and the code compiled by the evaluator are shared with the copy, while the
+        configuration, history memory, entry and idle times, event queues, clock and context are copied
+        (see *Evaluator.fork*). Listeners are not attached to the copy, and methods that were
+        wrapped on this instance (e.g. by *log_trace*) are not wrapped on the copy.
+
+        :return: a new interpreter
+        """
+        klass = self.__class__
+        clone = klass.__new__(klass)
+        clone.__dict__.update((k, v) for k, v in self.__dict__.items() if not hasattr(klass, k))
+
+        clone.clock = copy.copy(self.clock)
+        clone._memory = self._memory.copy()
+        clone._configuration = self._configuration.copy()
+        clone._entry_time = self._entry_time.copy()
+        clone._idle_time = self._idle_time.copy()
+        clone._sent_events = self._sent_events.copy()
+        clone._internal_queue = self._internal_queue.copy()
+        clone._external_queue = self._external_queue.copy()
+        clone._listeners = []
+        clone._evaluator = self._evaluator.fork(clone)
+        return clone
+
+    def snapshot(self) -> bytes:
+        """
+        Serialize the runtime state of this interpreter.
+
+        Only the dynamic state is serialized: the configuration, history memory, entry and idle times,
+        event queues, time of the clock and context. States are encoded by their position in
+        *Statechart.states*, and the fingerprint of the statechart (see *Statechart.fingerprint*) is
+        included so that the snapshot can only be restored for the same statechart. The statechart,
+        the listeners and the values of *__old__* in contracts are not part of the snapshot.
+        The context and the parameters of the events must be picklable.
+
+        Use *Interpreter.restore* to create an interpreter from a snapshot.
+
+        :return: a snapshot
+        """
+        ids = self._statechart._indexes()[1]
+
+        data = (
+            _SNAPSHOT_VERSION,
+            self._statechart.fingerprint(),
+            self._initialized,
+            self._time,
+            self.clock.time,
+            sorted(ids[name] for name in self._configuration),
+            [(ids[name], None if memory is None else [ids[n] for n in memory]) for name, memory in self._memory.items()],
+            [(ids[name], time) for name, time in self._entry_time.items()],
+            [(ids[name], time) for name, time in self._idle_time.items()],
+            self._internal_queue,
+            self._external_queue,
+            dict(self.context),
+        )
+        return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def restore(cls, statechart: Statechart, snapshot: bytes, **kwargs) -> 'Interpreter':
+        """
+        Create an interpreter from a snapshot (see *Interpreter.snapshot*).
+
+        The interpreter is created for given statechart using the remaining parameters (e.g. *evaluator_klass*
+        or *clock*), then its runtime state is replaced by the one of the snapshot. The time of the clock is
+        restored only if the clock is a *SimulatedClock* instance.
+
+        :param statechart: the statechart for which the snapshot was made
+        :param snapshot: a snapshot
+        :param kwargs: additional parameters for the constructor
+        :return: an interpreter
+        :raise ValueError: if the snapshot is not supported or does not match given statechart
+        """
+        data = pickle.loads(snapshot)
+        if data[0] != _SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version: {}'.format(data[0]))
+
+        (_, fingerprint, initialized, last_time, clock_time, configuration, memory,
+         entry_time, idle_time, internal_queue, external_queue, context) = data
+
+        if fingerprint != statechart.fingerprint():
+            raise ValueError('Snapshot does not match statechart {}'.format(statechart.name))
+        names = statechart.states
+
+        interpreter = cls(statechart, **kwargs)
+
+        if isinstance(interpreter.clock, SimulatedClock):
+            interpreter.clock.time = clock_time
+        interpreter._initialized = initialized
+        interpreter._time = last_time
+        interpreter._configuration = {names[i] for i in configuration}
+        interpreter._memory = {names[i]: None if m is None else [names[j] for j in m] for i, m in memory}
+        interpreter._entry_time = {names[i]: time for i, time in entry_time}
+        interpreter._idle_time = {names[i]: time for i, time in idle_time}
+        interpreter._internal_queue = internal_queue
+        interpreter._external_queue = external_queue
+
+        # Context is restored after the preamble was executed
+        current_context = cast(Dict[str, Any], interpreter.context)
+        current_context.clear()
+        current_context.update(context)
+
+        return interpreter
+
     def attach(self, listener: Callable[[MetaEvent], Any]) -> None:
         """
         Attach given listener to the current interpreter.
@@ -265,6 +427,88 @@ class Interpreter:
             macro_step = self.execute_once()
         return returned_steps
 
+    def simulate_until(self, time: float, *, step: float=None) -> List[MacroStep]:
+        """
+        Execute the statechart until given time is reached, using a discrete-event simulation.
+
+        Instead of repeatedly incrementing the clock, the clock is moved directly to the next
+        point in time at which a step could occur, i.e., when a queued (possibly delayed) event
+        becomes available, or when an *after* or *idle* predicate of an eventless transition
+        of an active state becomes true. No step is executed in between.
+
+        The points in time at which a guard could become true are obtained from the evaluator
+        (see *Evaluator.time_constraints*). If they cannot be determined for a guard (e.g., because
+        it relies on *time*), the clock is moved by *step* seconds instead. If *step* is not
+        provided, an *ExecutionError* is raised.
+
+        This method requires the interpreter to rely on a *SimulatedClock*.
+
+        :param time: time until which the statechart has to be simulated.
+        :param step: optional time increment to use for guards whose time constraints are unknown.
+        :return: A list of *MacroStep* instances
+        :raise ExecutionError: if time constraints cannot be determined and *step* is not provided.
+        """
+        if not isinstance(self.clock, SimulatedClock):
+            raise TypeError('simulate_until requires a SimulatedClock, not {}'.format(self.clock))
+
+        returned_steps = self.execute()
+        next_time = self._next_time(step)
+        while next_time is not None and next_time <= time:
+            self.clock.time = next_time
+            returned_steps.extend(self.execute())
+            next_time = self._next_time(step)
+
+        if self.clock.time < time:
+            self.clock.time = time
+            returned_steps.extend(self.execute())
+
+        return returned_steps
+
+    def _next_time(self, step: float=None) -> Optional[float]:
+        """
+        Return the next point in time at which a step could occur, assuming that no step
+        can be processed at current time.
+
+        :param step: optional time increment to use for guards whose time constraints are unknown.
+        :return: next point in time, or None if nothing can happen anymore.
+        :raise ExecutionError: if time constraints cannot be determined and *step* is not provided.
+        """
+        if self.final:
+            return None
+
+        times = []  # type: List[float]
+
+        # Queued events
+        for queue in cast(Tuple[List[Tuple[float, Event]]], (self._internal_queue, self._external_queue)):
+            if len(queue) > 0:
+                times.append(queue[0][0])
+
+        # Time constraints on the guards of eventless transitions
+        for source in sorted(self._configuration):
+            for transition in self._statechart.outgoing_transitions_for(source):
+                if transition.event is not None:
+                    continue
+
+                constraints = self._evaluator.time_constraints(transition.guard)
+                if constraints is None:
+                    if step is None:
+                        raise ExecutionError(
+                            'Unable to determine when guard "{}" of {} could hold. Provide a step value.'
+                            .format(transition.guard, transition)
+                        )
+                    times.append(self.time + step)
+                    continue
+
+                for predicate, seconds in constraints:
+                    if predicate == 'after':
+                        reference = self._entry_time[source]
+                    else:
+                        reference = self._idle_time[source]
+                    times.append(_earliest_time(reference, seconds))
+
+        times = [t for t in times if t > self.time]
+        return min(times) if len(times) > 0 else None
+
     def execute_once(self) -> Optional[MacroStep]:
         """
         Select transitions that can be fired based on available queued events, process them and stabilize
@@ -310,7 +554,13 @@ class Interpreter:
             macro_step = None
 
         # Check state invariants
-        configuration = self.configuration  # Use self.configuration to benefit from the sorting by depth
+        if macro_step is None and self._lazy_invariants:
+            # Nothing changed, except time
+            names = [name for name in self._configuration if self._has_time_dependent_invariants(name)]
+            configuration = sorted(names, key=lambda s: (self._statechart.depth_for(s), s))
+        else:
+            configuration = self.configuration  # Use self.configuration to benefit from the sorting by depth
+
         for name in configuration:
             state = self._statechart.state_for(name)
             self._evaluate_contract_conditions(state, 'invariants', macro_step)
@@ -319,6 +569,23 @@ class Interpreter:
 
         return macro_step
 
+    def _has_time_dependent_invariants(self, name: str) -> bool:
+        """
+        Return True if one of the invariants of given state depends on time.
+
+        :param name: name of a state
+        :return: True if the truth value of an invariant could change over time.
+        """
+        for invariant in getattr(self._statechart.state_for(name), 'invariants', []):
+            try:
+                dependent = self._time_dependent_invariants[invariant]
+            except KeyError:
+                dependent = self._evaluator.time_constraints(invariant) != []
+                self._time_dependent_invariants[invariant] = dependent
+            if dependent:
+                return True
+        return False
+
     def _queue_event(self, event: Event):
         """
         Convenient helper to queue events wrt. to internal/external and their (optional) delay.
@@ -394,8 +661,8 @@ class Interpreter:
         _state_depth_cache = dict()  # type: Dict[str, int]
 
         # Select triggerable (based on event) transitions for considered states
-        for transition in self._statechart.transitions:
-            if transition.source in states:
+        for state in set(states):
+            for transition in self._statechart.outgoing_transitions_for(state):
                 if transition.event is None or transition.event == getattr(event, 'name', None):
                     # Compute order based on depth
                     if transition.source not in _state_depth_cache:
@@ -460,43 +727,111 @@ class Interpreter:
         if len(transitions) > 1:
             # If more than one transition, we check (1) they are from separate regions and (2) they do not conflict
             # Two transitions conflict if one of them leaves the parallel state
-            for t1, t2 in combinations(transitions, 2):
-                # Check (1)
-                lca = cast(str, self._statechart.least_common_ancestor(t1.source, t2.source))
-                lca_state = self._statechart.state_for(lca)
-
-                # Their LCA must be an orthogonal state!
-                if not isinstance(lca_state, OrthogonalState):
-                    raise NonDeterminismError(
-                        'Non-determinist choice between transitions {t1} and {t2}'
-                        '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
-                        .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
-                    )
-
-                # Check (2)
-                # This check must be done wrt. to LCA, as the combination of from_states could
-                # come from nested parallel regions!
-                for transition in [t1, t2]:
-                    last_before_lca = transition.source
-                    for state in self._statechart.ancestors_for(transition.source):
-                        if state == lca:
-                            break
-                        last_before_lca = state
-                    # Target must be a descendant (or self) of this state
-                    if (transition.target and
-                            (transition.target not in
-                             [last_before_lca] + self._statechart.descendants_for(last_before_lca))):
-                        raise ConflictingTransitionsError(
-                            'Conflicting transitions: {t1} and {t2}'
-                            '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
-                            .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
-                        )
+            if not self._transitions_are_compatible(transitions):
+                # Look for the pair of transitions to report
+                self._check_transition_pairs(transitions)
 
             # Define an arbitrary order based on the depth and the name of source states.
             transitions = sorted(transitions, key=lambda t: (-self._statechart.depth_for(t.source), t.source))
 
         return transitions
 
+    def _transitions_are_compatible(self, transitions: List[Transition]) -> bool:
+        """
+        Return True if every pair of given transitions passes the checks of *_check_transition_pairs*.
+
+        For each transition, the least common ancestors it has with the other transitions are
+        among the ancestors of its source. The number of other transitions sharing a given least
+        common ancestor is obtained from the preorder numbering of the states (see
+        *Statechart._subtree_ranges*) and a binary search, so the checks are not done pairwise.
+
+        :param transitions: a list of *Transition* instances
+        :return: True if transitions can be processed together, False if at least one pair has to be reported.
+        """
+        statechart = self._statechart
+        subtrees = statechart._subtree_ranges()
+        positions = sorted(subtrees[transition.source][0] for transition in transitions)
+
+        def count(start: int, end: int) -> int:
+            # Number of transitions whose source is numbered in [start, end)
+            return bisect.bisect_left(positions, end) - bisect.bisect_left(positions, start)
+
+        for transition in transitions:
+            source = transition.source
+            nb_paired = 0
+            region = None  # Child of the deepest least common ancestor, on the way to source
+
+            child = source
+            for ancestor in statechart.ancestors_for(source):
+                # Other transitions whose least common ancestor with this one is *ancestor*
+                start, end = subtrees[ancestor]
+                others = count(start + 1, end)
+                if child == source:
+                    others -= 1
+                else:
+                    start, end = subtrees[child]
+                    others -= count(start + 1, end)
+
+                if others > 0:
+                    # Check (1)
+                    if not isinstance(statechart.state_for(ancestor), OrthogonalState):
+                        return False
+                    region = child if region is None else region
+                    nb_paired += others
+                child = ancestor
+
+            # Some pairs have no common ancestor
+            if nb_paired != len(transitions) - 1:
+                return False
+
+            # Check (2), the deepest least common ancestor being the most restrictive
+            if transition.target and region is not None:
+                start, end = subtrees[region]
+                if not start <= subtrees[transition.target][0] < end:
+                    return False
+
+        return True
+
+    def _check_transition_pairs(self, transitions: List[Transition]) -> None:
+        """
+        Check that every pair of given transitions (1) are from separate regions and (2) do not conflict.
+
+        :param transitions: a list of *Transition* instances
+        :raise ExecutionError: In case of non-determinism (*NonDeterminismError*) or conflicting
+            transitions (*ConflictingTransitionsError*).
+        """
+        for t1, t2 in combinations(transitions, 2):
+            # Check (1)
+            lca = cast(str, self._statechart.least_common_ancestor(t1.source, t2.source))
+            lca_state = self._statechart.state_for(lca)
+
+            # Their LCA must be an orthogonal state!
+            if not isinstance(lca_state, OrthogonalState):
+                raise NonDeterminismError(
+                    'Non-determinist choice between transitions {t1} and {t2}'
+                    '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
+                    .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
+                )
+
+            # Check (2)
+            # This check must be done wrt. to LCA, as the combination of from_states could
+            # come from nested parallel regions!
+            for transition in [t1, t2]:
+                last_before_lca = transition.source
+                for state in self._statechart.ancestors_for(transition.source):
+                    if state == lca:
+                        break
+                    last_before_lca = state
+                # Target must be a descendant (or self) of this state
+                if (transition.target and
+                        (transition.target not in
+                         [last_before_lca] + self._statechart.descendants_for(last_before_lca))):
+                    raise ConflictingTransitionsError(
+                        'Conflicting transitions: {t1} and {t2}'
+                        '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
+                        .format(c=self.configuration, e=t1.event, t=transitions, t1=t1, t2=t2)
+                    )
+
     def _compute_steps(self) -> List[MicroStep]:
         """
         Compute and returns the next steps based on current configuration
@@ -1,7 +1,9 @@
 from .yaml import import_from_yaml, export_to_yaml
-from .plantuml import export_to_plantuml
+from .json import import_from_json, export_to_json
+from .plantuml import export_to_plantuml, PlantUMLExporter
 
 __all__ = [
     'import_from_yaml', 'export_to_yaml',
-    'export_to_plantuml',
+    'import_from_json', 'export_to_json',
+    'export_to_plantuml', 'PlantUMLExporter',
 ]
@@ -0,0 +1,112 @@
+import importlib.util
+import marshal
+
+from typing import Dict, Iterator, Tuple
+
+from ..code import PythonEvaluator
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict
+
+__all__ = ['import_from_bundle', 'export_to_bundle']
+
+
+# Version of the format of bundles
+_BUNDLE_VERSION = 1
+
+
+def _code_for(statechart: Statechart) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the pieces of code contained in given statechart, with the mode
+    in which they are compiled by a *PythonEvaluator* ('eval' or 'exec').
+    """
+    if statechart.preamble:
+        yield statechart.preamble, 'exec'
+
+    elements = [statechart.state_for(name) for name in statechart.states]  # type: list
+    elements.extend(statechart.transitions)
+
+    for element in elements:
+        for code in ('on_entry', 'on_exit', 'action'):
+            if getattr(element, code, None):
+                yield getattr(element, code), 'exec'
+        if getattr(element, 'guard', None):
+            yield element.guard, 'eval'
+        for condition in ('preconditions', 'postconditions', 'invariants'):
+            for code in getattr(element, condition, []):
+                yield code, 'eval'
+
+
+def export_to_bundle(statechart: Statechart, filepath: str=None) -> bytes:
+    """
+    Export given *Statechart* instance to a bundle. A bundle contains the structure of the statechart
+    along with its code, compiled for the current version of Python. Its binary representation is
+    returned by this function. Automatically save the output to filepath, if provided.
+
+    Pieces of code that cannot be compiled are not included.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :return: A binary representation
+    """
+    compiled = {'eval': {}, 'exec': {}}  # type: Dict[str, Dict[str, object]]
+    for code, mode in _code_for(statechart):
+        try:
+            compiled[mode][code] = compile(code, '<string>', mode)
+        except SyntaxError:
+            pass
+
+    output = marshal.dumps((
+        _BUNDLE_VERSION,
+        importlib.util.MAGIC_NUMBER,
+        export_to_dict(statechart, ordered=False),
+        marshal.dumps((compiled['eval'], compiled['exec'])),
+    ))
+
+    if filepath:
+        with open(filepath, 'wb') as f:
+            f.write(output)
+
+    return output
+
+
+def import_from_bundle(data: bytes=None, filepath: str=None, *, ignore_validation: bool=False) -> Statechart:
+    """
+    Import a statechart from a bundle (first argument) or a bundle file (filepath argument),
+    see *export_to_bundle*.
+
+    The compiled code of the bundle is registered using *PythonEvaluator.add_compiled_code*, so that
+    evaluators do not need to compile it. If the bundle was made for another version of Python, its
+    compiled code is ignored and the code is compiled from its source, as usual.
+
+    :param data: A bundle. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a bundle file.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :return: a *Statechart* instance
+    :raise ValueError: if the bundle is not supported
+    """
+    if not data and not filepath:
+        raise TypeError('A bundle must be provided, either using first argument or filepath argument.')
+    elif data and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+
+    try:
+        version, magic_number, structure, code = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as e:
+        raise ValueError('Invalid bundle') from e
+
+    if version != _BUNDLE_VERSION:
+        raise ValueError('Unsupported bundle version: {}'.format(version))
+
+    sc = import_from_dict(structure, consume=True)
+
+    if not ignore_validation:
+        sc.validate()
+
+    if magic_number == importlib.util.MAGIC_NUMBER:
+        PythonEvaluator.add_compiled_code(*marshal.loads(code))
+
+    return sc
@@ -0,0 +1,80 @@
+import hashlib
+import marshal
+import os
+
+from typing import Any, Mapping, Optional
+
+__all__ = ['load_from_cache', 'store_in_cache']
+
+
+# Version of the format of cache entries
+_CACHE_VERSION = 1
+
+
+def _entry_for(cache_dir: str, filepath: str) -> str:
+    """
+    Return the path of the cache entry for given file.
+    """
+    key = hashlib.sha256(os.path.abspath(filepath).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, key + '.statechart')
+
+
+def _signature(filepath: str, text: str) -> tuple:
+    """
+    Return the modification time, the size and a hash of the content of given file.
+    """
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size, hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_from_cache(cache_dir: str, filepath: str, text: str) -> Optional[Mapping[str, Any]]:
+    """
+    Return the validated data that were cached for given file, if any.
+
+    The cache entry is ignored if it is corrupted, if it was made by another version of this
+    module, or if the modification time, size or content of the file changed.
+
+    :param cache_dir: path to the cache directory
+    :param filepath: path to the YAML file
+    :param text: content of the YAML file
+    :return: the cached data, or None
+    """
+    try:
+        with open(_entry_for(cache_dir, filepath), 'rb') as f:
+            version, signature, data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if version != _CACHE_VERSION or signature != _signature(filepath, text) or not isinstance(data, dict):
+        return None
+    return data
+
+
+def store_in_cache(cache_dir: str, filepath: str, text: str, data: Mapping[str, Any]) -> None:
+    """
+    Cache the validated data of given file. Data that cannot be marshalled (e.g. dates if the schema
+    validation was disabled) are not cached. Errors when writing the cache entry (e.g. if the cache
+    directory is read-only) are ignored.
+
+    :param cache_dir: path to the cache directory
+    :param filepath: path to the YAML file
+    :param text: content of the YAML file
+    :param data: the validated data
+    """
+    try:
+        content = marshal.dumps((_CACHE_VERSION, _signature(filepath, text), data))
+    except ValueError:
+        return
+
+    entry = _entry_for(cache_dir, filepath)
+    temporary = '{}.{}.tmp'.format(entry, os.getpid())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temporary, 'wb') as f:
+            f.write(content)
+        os.replace(temporary, entry)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from typing import Any, List, Mapping, MutableMapping, Optional, Tuple, cast
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Tuple, cast
 
 from ..exceptions import StatechartError
 from ..model import (ActionStateMixin, BasicState, CompositeStateMixin,
@@ -10,18 +10,33 @@ from ..model import (ActionStateMixin, BasicState, CompositeStateMixin,
 __all__ = ['import_from_dict', 'export_to_dict']
 
 
-def import_from_dict(data: Mapping[str, Any]) -> Statechart:
+def import_from_dict(data: Mapping[str, Any], *, consume: bool=False) -> Statechart:
+    """
+    Import a statechart from given dict, as obtained from *export_to_dict* or from a YAML file.
+
+    The statechart is built using *Statechart.from_elements*. If *consume* is set, the content of
+    given dict is removed as the states and transitions are created, so that the memory used by the
+    dict can be reclaimed before the whole statechart is built.
+
+    :param data: a dict representing a statechart
+    :param consume: set to *True* to empty given dict while building the statechart.
+    :return: a *Statechart* instance
+    """
     data = data['statechart']
 
-    statechart = Statechart(name=data['name'],
-                            description=data.get('description', None),
-                            preamble=data.get('preamble', None))
+    name = data['name']
+    description = data.get('description', None)
+    preamble = data.get('preamble', None)
 
-    states = []  # (StateMixin instance, parent name)
+    states = []  # StateMixin instances
+    parents = {}  # type: Dict[str, Optional[str]]
     transitions = []  # Transition instances
     # (State dict, parent name)
     data_to_consider = [(data['root state'], None)]  # type: List[Tuple[Mapping[str, Any], Optional[str]]]
 
+    if consume:
+        cast(MutableMapping, data).clear()
+
     while data_to_consider:
         state_data, parent_name = data_to_consider.pop()
 
@@ -32,7 +47,8 @@ def import_from_dict(data: Mapping[str, Any]) -> Statechart:
             raise
         except Exception as e:
             raise StatechartError('Unable to load given YAML') from e
-        states.append((state, parent_name))
+        states.append(state)
+        parents[state.name] = parent_name
 
         # Get substates
         if isinstance(state, CompoundState):
@@ -52,13 +68,10 @@ def import_from_dict(data: Mapping[str, Any]) -> Statechart:
                 raise StatechartError('Unable to load given YAML') from e
             transitions.append(transition)
 
-    # Register on statechart
-    for state, parent in states:
-        statechart.add_state(state, parent)
-    for transition in transitions:
-        statechart.add_transition(transition)
+        if consume:
+            cast(MutableMapping, state_data).clear()
 
-    return statechart
+    return Statechart.from_elements(name, states, parents, transitions, description=description, preamble=preamble)
 
 
 def _import_transition_from_dict(state_name: str, transition_d: Mapping[str, Any]) -> Transition:
@@ -164,15 +177,82 @@ def export_to_dict(statechart: Statechart, ordered=True) -> Mapping[str, Any]:
     if statechart.preamble:
         d['preamble'] = statechart.preamble
 
-    d['root state'] = _export_state_to_dict(statechart, cast(str, statechart.root), ordered)
+    # Group transitions by source, preserving their order
+    transitions = {}  # type: Dict[str, List[Transition]]
+    for transition in statechart.transitions:
+        transitions.setdefault(transition.source, []).append(transition)
+
+    # Iterative depth-first traversal, each state being added to the children of its parent
+    root_data = []  # type: List[Mapping[str, Any]]
+    stack = [(cast(str, statechart.root), root_data)]  # type: List[Tuple[str, List[Mapping[str, Any]]]]
+    while stack:
+        name, siblings_data = stack.pop()
+        state = statechart.state_for(name)
+        data = _export_state_to_dict(state, transitions.get(name, []), ordered)
+        siblings_data.append(data)
+
+        if isinstance(state, CompositeStateMixin):
+            children_data = []  # type: List[Mapping[str, Any]]
+            if isinstance(state, CompoundState):
+                data['states'] = children_data
+            elif isinstance(state, OrthogonalState):
+                data['parallel states'] = children_data
+
+            for child in reversed(statechart.children_for(name)):
+                stack.append((child, children_data))
+
+    d['root state'] = root_data[0]
 
     return {'statechart': d}
 
 
-def _export_state_to_dict(statechart: Statechart, state_name: str, ordered=True) -> Mapping[str, Any]:
-    data = OrderedDict() if ordered else {}
+def _export_contract_to_list(element) -> Optional[List[Mapping[str, str]]]:
+    preconditions = getattr(element, 'preconditions', [])
+    postconditions = getattr(element, 'postconditions', [])
+    invariants = getattr(element, 'invariants', [])
+    if preconditions or postconditions or invariants:
+        conditions = []
+        for condition in preconditions:
+            conditions.append({'before': condition})
+        for condition in postconditions:
+            conditions.append({'after': condition})
+        for condition in invariants:
+            conditions.append({'always': condition})
+        return conditions
+    return None
+
+
+def _export_transition_to_dict(transition: Transition, ordered=True) -> MutableMapping[str, Any]:
+    transition_data = OrderedDict() if ordered else {}  # type: MutableMapping[str, Any]
+    if transition.event:
+        transition_data['event'] = transition.event
+    if transition.guard:
+        transition_data['guard'] = transition.guard
+    if transition.target:
+        transition_data['target'] = transition.target
+    if transition.action:
+        transition_data['action'] = transition.action
+    if transition.priority != Transition.DEFAULT_PRIORITY:
+        if transition.priority == Transition.LOW_PRIORITY:
+            priority = 'low'
+        elif transition.priority == Transition.HIGH_PRIORITY:
+            priority = 'high'
+        else:
+            priority = transition.priority
+        transition_data['priority'] = priority
+
+    conditions = _export_contract_to_list(transition)
+    if conditions:
+        transition_data['contract'] = conditions
+
+    return transition_data
 
-    state = statechart.state_for(state_name)
+
+def _export_state_to_dict(state: StateMixin, transitions: List[Transition], ordered=True) -> MutableMapping[str, Any]:
+    """
+    Export given state and its outgoing transitions to a dict, without its children.
+    """
+    data = OrderedDict() if ordered else {}  # type: MutableMapping[str, Any]
 
     data['name'] = state.name
     if isinstance(state, ShallowHistoryState):
@@ -196,66 +276,11 @@ def _export_state_to_dict(statechart: Statechart, state_name: str, ordered=True)
         if state.initial:
             data['initial'] = state.initial
 
-    preconditions = getattr(state, 'preconditions', [])
-    postconditions = getattr(state, 'postconditions', [])
-    invariants = getattr(state, 'invariants', [])
-    if preconditions or postconditions or invariants:
-        conditions = []
-        for condition in preconditions:
-            conditions.append({'before': condition})
-        for condition in postconditions:
-            conditions.append({'after': condition})
-        for condition in invariants:
-            conditions.append({'always': condition})
+    conditions = _export_contract_to_list(state)
+    if conditions:
         data['contract'] = conditions
 
-    if isinstance(state, TransitionStateMixin):
-        # event, guard, target, action
-        transitions = statechart.transitions_from(cast(StateMixin, state).name)
-        if len(transitions) > 0:
-            data['transitions'] = []
-
-            for transition in transitions:
-                transition_data = OrderedDict() if ordered else {}
-                if transition.event:
-                    transition_data['event'] = transition.event
-                if transition.guard:
-                    transition_data['guard'] = transition.guard
-                if transition.target:
-                    transition_data['target'] = transition.target
-                if transition.action:
-                    transition_data['action'] = transition.action
-                if transition.priority != Transition.DEFAULT_PRIORITY:
-                    if transition.priority == Transition.LOW_PRIORITY:
-                        priority = 'low'
-                    elif transition.priority == Transition.HIGH_PRIORITY:
-                        priority = 'high'
-                    else:
-                        priority = transition.priority
-                    transition_data['priority'] = priority
-
-                preconditions = getattr(transition, 'preconditions', [])
-                postconditions = getattr(transition, 'postconditions', [])
-                invariants = getattr(transition, 'invariants', [])
-                if preconditions or postconditions or invariants:
-                    conditions = []
-                    for condition in preconditions:
-                        conditions.append({'before': condition})
-                    for condition in postconditions:
-                        conditions.append({'after': condition})
-                    for condition in invariants:
-                        conditions.append({'always': condition})
-                    transition_data['contract'] = conditions
-
-                data['transitions'].append(transition_data)
-
-    if isinstance(state, CompositeStateMixin):
-        children = statechart.children_for(cast(StateMixin, state).name)
-        children_data = [_export_state_to_dict(statechart, child, ordered) for child in children]
-
-        if isinstance(state, CompoundState):
-            data['states'] = children_data
-        elif isinstance(state, OrthogonalState):
-            data['parallel states'] = children_data
+    if isinstance(state, TransitionStateMixin) and len(transitions) > 0:
+        data['transitions'] = [_export_transition_to_dict(transition, ordered) for transition in transitions]
 
     return data
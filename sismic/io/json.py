@@ -0,0 +1,63 @@
+import json
+
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict
+from .yaml import _validate_structure
+
+__all__ = ['import_from_json', 'export_to_json']
+
+
+def import_from_json(text: str=None, filepath: str=None, *, ignore_schema: bool=False,
+                     ignore_validation: bool=False, fast: bool=False) -> Statechart:
+    """
+    Import a statechart from a JSON representation (first argument) or a JSON file (filepath argument).
+
+    The JSON representation has the same structure than the YAML one (see *import_from_yaml*).
+    Unless specified, this structure is validated against the same schema, and the resulting
+    statechart is validated using its *validate()* method.
+
+    :param text: A JSON text. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a JSON file.
+    :param ignore_schema: set to *True* to disable structure validation.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :param fast: set to *True* to use a dedicated validation that is faster than the schema library.
+    :return: a *Statechart* instance
+    """
+    if not text and not filepath:
+        raise TypeError('A JSON must be provided, either using first argument or filepath argument.')
+    elif text and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'r') as f:
+            text = f.read()
+
+    data = json.loads(text)
+
+    if not ignore_schema:
+        data = _validate_structure(data, fast=fast, kind='JSON')
+
+    sc = import_from_dict(data, consume=True)
+
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def export_to_json(statechart: Statechart, filepath: str=None, *, indent: int=None) -> str:
+    """
+    Export given *Statechart* instance to JSON. Its JSON representation is returned by this function.
+    Automatically save the output to filepath, if provided.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :param indent: an optional indentation level, for a more readable output
+    :return: A textual JSON representation
+    """
+    output = json.dumps(export_to_dict(statechart, ordered=True), indent=indent)
+
+    if filepath:
+        with open(filepath, 'w') as f:
+            f.write(output)
+
+    return output
@@ -0,0 +1,64 @@
+import msgpack
+
+from ..model import Statechart
+
+from .datadict import export_to_dict, import_from_dict
+from .yaml import _validate_structure
+
+__all__ = ['import_from_msgpack', 'export_to_msgpack']
+
+
+def import_from_msgpack(data: bytes=None, filepath: str=None, *, ignore_schema: bool=False,
+                        ignore_validation: bool=False, fast: bool=False) -> Statechart:
+    """
+    Import a statechart from a MessagePack representation (first argument) or a MessagePack file
+    (filepath argument). This requires the *msgpack* package.
+
+    The MessagePack representation has the same structure than the YAML one (see *import_from_yaml*).
+    Unless specified, this structure is validated against the same schema, and the resulting
+    statechart is validated using its *validate()* method.
+
+    :param data: A MessagePack representation. If not provided, filepath argument has to be provided.
+    :param filepath: A path to a MessagePack file.
+    :param ignore_schema: set to *True* to disable structure validation.
+    :param ignore_validation: set to *True* to disable statechart validation.
+    :param fast: set to *True* to use a dedicated validation that is faster than the schema library.
+    :return: a *Statechart* instance
+    """
+    if not data and not filepath:
+        raise TypeError('A MessagePack representation must be provided, either using first argument or filepath argument.')
+    elif data and filepath:
+        raise TypeError('Either provide first argument or filepath argument, not both.')
+    elif filepath:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+
+    structure = msgpack.unpackb(data, raw=False)
+
+    if not ignore_schema:
+        structure = _validate_structure(structure, fast=fast, kind='MessagePack')
+
+    sc = import_from_dict(structure, consume=True)
+
+    if not ignore_validation:
+        sc.validate()
+    return sc
+
+
+def export_to_msgpack(statechart: Statechart, filepath: str=None) -> bytes:
+    """
+    Export given *Statechart* instance to MessagePack. Its MessagePack representation is returned by
+    this function. Automatically save the output to filepath, if provided.
+    This requires the *msgpack* package.
+
+    :param statechart: statechart to export
+    :param filepath: save output to given filepath, if provided
+    :return: A binary MessagePack representation
+    """
+    output = msgpack.packb(export_to_dict(statechart, ordered=False), use_bin_type=True)
+
+    if filepath:
+        with open(filepath, 'wb') as f:
+            f.write(output)
+
+    return output
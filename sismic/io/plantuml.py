@@ -2,7 +2,8 @@ import argparse
 import re
 import sys
 
-from typing import Dict, List, Tuple, Union
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Tuple, Union
 from ..io import import_from_yaml
 from ..model import (
     DeepHistoryState, FinalState, Transition, CompoundState,
@@ -10,10 +11,26 @@ from ..model import (
     ActionStateMixin, ContractMixin)
 
 
-__all__ = ['export_to_plantuml']
+__all__ = ['export_to_plantuml', 'PlantUMLExporter']
 
 
 class PlantUMLExporter:
+    """
+    Export a statechart to PlantUML (see *export_to_plantuml* for the parameters).
+    Unlike *export_to_plantuml*, descriptions, preambles and contracts are included by default.
+
+    The lines produced for each state are kept between calls to *export*: when the statechart
+    is exported again after some changes, the lines of the states whose own properties and
+    outgoing transitions did not change are reused instead of being generated again.
+    Attributes *configuration* and *coverage* can be changed between two calls to *export*.
+    """
+
+    # Border of active states
+    ACTIVE_STYLE = '##[bold]blue'
+
+    # Arrows in a previously exported representation
+    ARROW_PATTERN = re.compile(r'(\[\*\]|[a-zA-Z0-9]+) -([^ ]*)> (\[\*\]|[a-zA-Z0-9]+)')
+
     def __init__(
             self,
             statechart: Statechart, *,
@@ -24,7 +41,9 @@ class PlantUMLExporter:
             state_contracts: bool=True,
             state_action: bool=True,
             transition_contracts: bool=True,
-            transition_action: bool=True) -> None:
+            transition_action: bool=True,
+            configuration: Iterable[str]=None,
+            coverage: Mapping[str, Counter]=None) -> None:
         self.statechart = statechart
         self.based_on = based_on
         self.statechart_name = statechart_name
@@ -34,17 +53,36 @@ class PlantUMLExporter:
         self.state_action = state_action
         self.transition_contracts = transition_contracts
         self.transition_action = transition_action
+        self.configuration = configuration
+        self.coverage = coverage
 
         self._based_on_arrows = dict()  # type: Dict[Tuple[str, str], str]
         if self.based_on:
             for line in self.based_on.splitlines():
-                matches = re.findall(r'(\[\*\]|[a-zA-Z0-9]+) -([^ ]*)> (\[\*\]|[a-zA-Z0-9]+)', line)
-                if matches:
-                    self._based_on_arrows[(matches[0][0], matches[0][2])] = '-{}>'.format(matches[0][1])
+                if '>' not in line:
+                    continue
+                match = self.ARROW_PATTERN.search(line)
+                if match:
+                    self._based_on_arrows[(match.group(1), match.group(3))] = '-{}>'.format(match.group(2))
 
         self._output = []  # type: List[str]
         self._indent = 0
 
+        # Transitions by source and by target, built by export
+        self._transitions_from = {}  # type: Dict[str, List[Transition]]
+        self._transitions_to = {}  # type: Dict[str, List[Transition]]
+
+        # Active states and counters of the coverage, set by export
+        self._active = frozenset()  # type: FrozenSet[str]
+        self._entered = Counter()  # type: Counter
+        self._processed = Counter()  # type: Counter
+        self._max_entered = 0
+        self._max_processed = 0
+
+        # Key and lines of each state, as generated by the latest export with given options
+        self._cache = {}  # type: Dict[str, Tuple[Any, List[str]]]
+        self._cache_options = ()  # type: tuple
+
     def arrow(self, source, target):
         # source = None --> initial state
         if not self.based_on:
@@ -79,6 +117,41 @@ class PlantUMLExporter:
     def state_id(name: str) -> str:
         return ''.join(filter(str.isalnum, name))
 
+    @staticmethod
+    def heat_color(count: int, maximum: int) -> str:
+        """
+        Return a color ranging from white (for 0) to red (for maximum).
+
+        :param count: a number of occurrences
+        :param maximum: the largest number of occurrences
+        :return: a color in hexadecimal notation
+        """
+        level = round(255 * (1 - count / maximum)) if maximum > 0 else 255
+        return '#FF{0:02X}{0:02X}'.format(level)
+
+    def state_style(self, name: str) -> str:
+        """
+        Return the style of given state: its background color depends on the number of times it was entered
+        according to the coverage, and it has a bold border if it is active.
+        """
+        style = []
+        count = self._entered.get(name, 0)
+        if count > 0:
+            style.append(self.heat_color(count, self._max_entered))
+        if name in self._active:
+            style.append(self.ACTIVE_STYLE)
+        return ' '.join(style)
+
+    def transition_color(self, transition: Transition) -> str:
+        """
+        Return the color of given transition, depending on the number of times it was processed
+        according to the coverage, or an empty string if it was not processed.
+        """
+        count = self._processed.get(transition, 0)
+        if count > 0:
+            return self.heat_color(count, self._max_processed)
+        return ''
+
     def export_statechart(self):
         if self.statechart_name and self.statechart.name:
             self.output('title {}'.format(self.statechart.name))
@@ -93,22 +166,81 @@ class PlantUMLExporter:
             self.deindent()
             self.output('end note')
 
+    def _transition_key(self, transition: Transition) -> tuple:
+        """
+        Return a tuple of the properties of given transition that are used by the export.
+        """
+        target_is_final = transition.target is not None and isinstance(self.statechart.state_for(transition.target), FinalState)
+        return (
+            transition.source, transition.target, target_is_final, transition.event, transition.guard,
+            transition.action, transition.priority, tuple(transition.preconditions),
+            tuple(transition.invariants), tuple(transition.postconditions), self.transition_color(transition),
+        )
+
+    def _state_key(self, state) -> tuple:
+        """
+        Return a tuple of the properties of given state that are used to export it, excluding its descendants.
+        """
+        if isinstance(state, FinalState):
+            transitions = self._transitions_to.get(state.name, [])
+        else:
+            transitions = self._transitions_from.get(state.name, [])
+
+        initial = getattr(state, 'initial', None)
+        return (
+            self._indent, type(state), self.state_style(state.name), getattr(state, 'on_entry', None), getattr(state, 'on_exit', None),
+            tuple(getattr(state, 'preconditions', [])), tuple(getattr(state, 'invariants', [])),
+            tuple(getattr(state, 'postconditions', [])), getattr(state, 'memory', None), initial,
+            initial is not None and isinstance(self.statechart.state_for(initial), FinalState),
+            tuple(self._transition_key(transition) for transition in transitions),
+        )
+
     def export_state(self, name: str) -> None:
         state = self.statechart.state_for(name)
 
+        # Reuse the lines of the previous export if state did not change
+        key = self._state_key(state)
+        cached = self._cache.get(name, None)
+        if cached is not None and cached[0] == key:
+            self._output.extend(cached[1])
+        else:
+            start = len(self._output)
+            self.export_state_content(name)
+            self._cache[name] = (key, self._output[start:])
+
+        if isinstance(state, FinalState):
+            return
+
+        self.indent()
+
+        # Nested states
+        for i, child in enumerate(self.statechart.children_for(name)):
+            if i != 0 and isinstance(state, OrthogonalState):
+                self.output('--')
+            self.export_state(child)
+
+        self.deindent()
+        self.output('}')
+
+    def export_state_content(self, name: str) -> None:
+        state = self.statechart.state_for(name)
+
         # Special case for final state
         if isinstance(state, FinalState):
             # Find transitions leading to it
-            for transition in self.statechart.transitions_to(state.name):
+            for transition in self._transitions_to.get(state.name, []):
                 self.export_transition(transition)
             return
 
+        style = self.state_style(name)
+        style = ' ' + style if style else ''
+
         if isinstance(state, ShallowHistoryState):
-            self.output('state "H" as {} {{'.format(self.state_id(name)))
+            self.output('state "H" as {}{} {{'.format(self.state_id(name), style))
         elif isinstance(state, DeepHistoryState):
-            self.output('state "H*" as {} {{'.format(self.state_id(name)))
+            self.output('state "H*" as {}{} {{'.format(self.state_id(name), style))
         else:
-            self.output('state "{}" as {} {{'.format(name, self.state_id(name)))
+            self.output('state "{}" as {}{} {{'.format(name, self.state_id(name), style))
 
         self.indent()
 
@@ -131,7 +263,7 @@ class PlantUMLExporter:
                 ))
 
             # Internal actions
-            transitions = [tr for tr in self.statechart.transitions_from(name) if tr.internal and tr.action]
+            transitions = [tr for tr in self._transitions_from.get(name, []) if tr.internal and tr.action]
             if len(transitions) > 0:
                 for transition in transitions:
                     text = []
@@ -173,18 +305,11 @@ class PlantUMLExporter:
         if isinstance(state, (ShallowHistoryState, DeepHistoryState)):
             self.export_history_memory(state)
 
-        # Nested states
-        for i, child in enumerate(self.statechart.children_for(name)):
-            if i != 0 and isinstance(state, OrthogonalState):
-                self.output('--')
-            self.export_state(child)
-
         self.deindent()
-        self.output('}')
 
     def export_transitions(self, source_name: str) -> None:
         # Transitions (except internal ones)
-        transitions = filter(lambda t: not t.internal, self.statechart.transitions_from(source_name))
+        transitions = filter(lambda t: not t.internal, self._transitions_from.get(source_name, []))
 
         for transition in transitions:
             # Do not treat final states here
@@ -221,10 +346,15 @@ class PlantUMLExporter:
             for cond in transition.postconditions:
                 text.append('post: {}\n'.format(cond))
 
+        arrow = self.arrow(transition.source, transition.target)
+        color = self.transition_color(transition)
+        if color:
+            arrow = '-[{}]{}'.format(color, arrow[1:])
+
         _format = '{source} {arrow} {target} : {text}' if len(text) > 0 else '{source} {arrow} {target}'
         self.output(_format.format(
             source=self.state_id(transition.source),
-            arrow=self.arrow(transition.source, transition.target),
+            arrow=arrow,
             target=target_name,
             text=''.join(text),
         ))
@@ -235,11 +365,32 @@ class PlantUMLExporter:
 
             self.output('{source} {arrow} {target}'.format(
                 source=self.state_id(history_state.name),
-                arrow=self.arrow(history_state, target),
+                arrow=self.arrow(history_state.name, target.name),
                 target=self.state_id(target.name)
             ))
 
     def export(self) -> str:
+        self._output = []
+        self._indent = 0
+
+        options = (self.state_contracts, self.state_action, self.transition_contracts, self.transition_action)
+        if options != self._cache_options:
+            self._cache = {}
+            self._cache_options = options
+
+        self._transitions_from = {}
+        self._transitions_to = {}
+        for transition in self.statechart.transitions:
+            self._transitions_from.setdefault(transition.source, []).append(transition)
+            if transition.target is not None:
+                self._transitions_to.setdefault(transition.target, []).append(transition)
+
+        self._active = frozenset(self.configuration if self.configuration is not None else [])
+        self._entered = Counter(self.coverage.get('entered states', {})) if self.coverage else Counter()
+        self._processed = Counter(self.coverage.get('processed transitions', {})) if self.coverage else Counter()
+        self._max_entered = max(self._entered.values(), default=0)
+        self._max_processed = max(self._processed.values(), default=0)
+
         self.output('@startuml')
 
         self.export_statechart()
@@ -262,7 +413,9 @@ def export_to_plantuml(
         state_contracts: bool=False,
         state_action: bool=True,
         transition_contracts: bool=False,
-        transition_action: bool=True) -> str:
+        transition_action: bool=True,
+        configuration: Iterable[str]=None,
+        coverage: Mapping[str, Counter]=None) -> str:
     """
     Export given statechart to plantUML (see http://plantuml/plantuml).
     If a filepath is provided, also save the output to this file.
@@ -275,6 +428,12 @@ def export_to_plantuml(
     or as a filepath (based_on_filepath parameter), it will attempt to reuse the modifications made
     to the transitions (their direction and length).
 
+    The representation can include runtime information. If an active configuration is provided (e.g. the
+    *configuration* of an interpreter), active states are highlighted with a bold border. If coverage counters
+    are provided (e.g. the result of *sismic.helpers.coverage_from_trace*), the states are colored according
+    to the number of times they were entered, and the transitions according to the number of times they were
+    processed, from white (never) to red (most often).
+
     :param statechart: statechart to export
     :param filepath: save output to given filepath, if provided
     :param based_on: existing representation of the statechart in PlantUML
@@ -286,6 +445,9 @@ def export_to_plantuml(
     :param state_action: include state actions (on entry, on exit and internal transitions)
     :param transition_contracts: include transition contracts
     :param transition_action: include actions on transition
+    :param configuration: names of the active states to highlight
+    :param coverage: a dict whose keys are "entered states" and "processed transitions" and whose values
+        are *Counter* objects, used to color states and transitions
     :return: textual representation using plantuml
     """
 
@@ -305,6 +467,8 @@ def export_to_plantuml(
         state_action=state_action,
         transition_contracts=transition_contracts,
         transition_action=transition_action,
+        configuration=configuration,
+        coverage=coverage,
     )
 
     output = exporter.export()
@@ -327,6 +491,8 @@ def cli(args=None) -> int:
         help='A YAML file describing a statechart')
     parser.add_argument('--based-on', metavar='based', type=str, default=None, 
         help='A previously exported PlantUML representation for this statechart.')
+    parser.add_argument('--cache-dir', metavar='cache_dir', type=str, default=None,
+        help='A directory used to cache the parsed statecharts.')
     
     parser.add_argument('--show-description', dest='statechart_description', action='store_true', default=False, help='Show statechart description')
     parser.add_argument('--show-preamble', dest='statechart_preamble', action='store_true', default=False, help='Show statechart preamble')
@@ -338,7 +504,7 @@ def cli(args=None) -> int:
             
     args, parameters = parser.parse_known_args(args)
 
-    statechart = import_from_yaml(filepath=args.statechart)
+    statechart = import_from_yaml(filepath=args.statechart, cache_dir=args.cache_dir)
 
     if args.based_on:
         with open(args.based_on, 'r') as f:
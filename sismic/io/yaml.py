@@ -1,9 +1,12 @@
 import ruamel.yaml as yaml
 import schema
 
+from typing import Any, Callable, Dict, FrozenSet
+
 from ..exceptions import StatechartError
 from ..model import Statechart
 
+from .cache import load_from_cache, store_in_cache
 from .datadict import export_to_dict, import_from_dict
 
 __all__ = ['import_from_yaml', 'export_to_yaml']
@@ -45,17 +48,208 @@ class SCHEMA:
     }
 
 
-def import_from_yaml(text: str=None, filepath: str=None, *, ignore_schema: bool=False, ignore_validation: bool=False) -> Statechart:
+def _str(value: Any) -> str:
+    return str(value)
+
+
+def _list_of(convert: Callable[[Any], Any]) -> Callable[[Any], list]:
+    def convert_list(value: Any) -> list:
+        if not isinstance(value, list):
+            raise schema.SchemaError('{!r} should be a list'.format(value))
+        return [convert(item) for item in value]
+    return convert_list
+
+
+def _mapping(data: Any, fields: Dict[str, Callable[[Any], Any]], required: FrozenSet[str], what: str) -> dict:
+    """
+    Check that given data is a dict whose keys are in *fields*, and convert its values in place.
+
+    :param data: data to validate
+    :param fields: conversion function for each allowed key
+    :param required: required keys
+    :param what: description of the data, for error messages
+    :return: given data
+    """
+    if not isinstance(data, dict):
+        raise schema.SchemaError('{} should be a mapping, not {!r}'.format(what, data))
+
+    for key, value in data.items():
+        try:
+            convert = fields[key]
+        except (KeyError, TypeError):
+            raise schema.SchemaError('Wrong key {!r} in {} {!r}'.format(key, what, data)) from None
+        data[key] = convert(value)
+
+    missing = required.difference(data)
+    if missing:
+        raise schema.SchemaError('Missing keys {} in {} {!r}'.format(', '.join(sorted(missing)), what, data))
+    return data
+
+
+def _contract(value: Any) -> dict:
+    if isinstance(value, dict) and len(value) == 0:
+        raise schema.SchemaError('Missing condition in contract')
+    return _mapping(value, _FIELDS['contract'], frozenset(), 'contract')
+
+
+def _priority(value: Any) -> Any:
+    try:
+        return int(value)
+    except Exception:
+        if value in ('high', 'low'):
+            return value
+        raise schema.SchemaError('Invalid priority {!r}'.format(value)) from None
+
+
+def _state_type(value: Any) -> str:
+    if value in ('final', 'shallow history', 'deep history'):
+        return value
+    raise schema.SchemaError('Invalid state type {!r}'.format(value))
+
+
+def _transition(value: Any) -> dict:
+    return _mapping(value, _FIELDS['transition'], frozenset(), 'transition')
+
+
+def _state(value: Any) -> dict:
+    return _mapping(value, _FIELDS['state'], frozenset(['name']), 'state')
+
+
+def _statechart(value: Any) -> dict:
+    return _mapping(value, _FIELDS['statechart'], frozenset(['name', 'root state']), 'statechart')
+
+
+# Conversion functions equivalent to SCHEMA
+_FIELDS = {
+    'contract': {'before': _str, 'after': _str, 'always': _str},
+    'transition': {
+        'target': _str,
+        'event': _str,
+        'guard': _str,
+        'action': _str,
+        'contract': _list_of(_contract),
+        'priority': _priority,
+    },
+    'state': {
+        'name': _str,
+        'type': _state_type,
+        'on entry': _str,
+        'on exit': _str,
+        'transitions': _list_of(_transition),
+        'contract': _list_of(_contract),
+        'initial': _str,
+        'parallel states': _list_of(_state),
+        'states': _list_of(_state),
+        'memory': _str,
+    },
+    'statechart': {
+        'name': _str,
+        'description': _str,
+        'preamble': _str,
+        'root state': _state,
+    },
+}  # type: Dict[str, Dict[str, Callable[[Any], Any]]]
+
+
+def _validate(data: Any) -> dict:
+    """
+    Validate given data against SCHEMA in a single pass, converting values in place.
+
+    :param data: data loaded from a YAML
+    :return: given data
+    :raise schema.SchemaError: if data does not match the schema
+    """
+    return _mapping(data, {'statechart': _statechart}, frozenset(['statechart']), 'document')
+
+
+def _validate_structure(data: Any, *, fast: bool=False, kind: str='YAML') -> dict:
+    """
+    Validate given data against SCHEMA.
+
+    :param data: data to validate
+    :param fast: set to *True* to use the dedicated validation instead of the schema library.
+    :param kind: kind of representation the data come from, for error messages
+    :return: the validated data
+    :raise StatechartError: if data does not match the schema
+    """
+    try:
+        if fast:
+            return _validate(data)
+        else:
+            return schema.Schema(SCHEMA.statechart).validate(data)
+    except schema.SchemaError as e:
+        raise StatechartError('{} validation failed'.format(kind)) from e
+
+
+# Maximum line width of exported YAML
+_WIDTH = 1000
+
+
+class _Dumper(getattr(yaml, 'CDumper', yaml.Dumper)):  # type: ignore
+    """
+    Dumper based on the C-accelerated emitter of ruamel.yaml (if available), whose output is identical
+    to the one of the default dumper.
+    """
+
+
+class _FoldedScalar(Exception):
+    """
+    Raised when a string could be folded, as the two emitters do not fold strings at the same positions.
+    """
+
+
+# The analysis of scalars by the emitter of ruamel.yaml does not depend on the output stream
+_emitter = yaml.Dumper(None)
+
+
+def _represent_str(dumper, value: str):
+    style = None
+    analysis = None
+
+    # Unlike the C emitter, the emitter of ruamel.yaml uses double quotes for strings that
+    # cannot be plain and that contain a quote or a line break.
+    if "'" in value or '\n' in value:
+        analysis = _emitter.analyze_scalar(value)
+        if not analysis.allow_block_plain:
+            style = '"'
+
+    # An escaped character takes at most 10 characters
+    if len(value) * 10 >= _WIDTH // 2:
+        analysis = _emitter.analyze_scalar(value) if analysis is None else analysis
+        if style == '"' or not (analysis.allow_block_plain or analysis.allow_single_quoted):
+            if len(value.encode('unicode_escape')) + value.count('"') >= _WIDTH // 2:
+                raise _FoldedScalar()
+
+    return dumper.represent_scalar('tag:yaml.org,2002:str', value, style=style)
+
+
+if _Dumper.__bases__[0] is not yaml.Dumper:
+    _Dumper.add_representer(str, _represent_str)
+
+
+def import_from_yaml(text: str=None, filepath: str=None, *, ignore_schema: bool=False,
+                     ignore_validation: bool=False, fast: bool=False, cache_dir: str=None) -> Statechart:
     """
     Import a statechart from a YAML representation (first argument) or a YAML file (filepath argument).
 
     Unless specified, the structure contained in the YAML is validated against a predefined
     schema (see *sismic.io.SCHEMA*), and the resulting statechart is validated using its *validate()* method.
 
+    If *fast* is set, the YAML is parsed using the C-accelerated loader of ruamel.yaml (if available), and
+    its structure is validated by a dedicated function that is equivalent to the predefined schema but
+    considerably faster. Notice that messages of validation errors differ between the two modes.
+
+    If *cache_dir* is provided along with *filepath*, the validated structure of the YAML is stored in
+    given directory, and is reused as long as the modification time and the content of the file do
+    not change. Parsing and schema validation are then skipped. The cache is not used if *ignore_schema*
+    is set. Cache entries that cannot be read or written are ignored.
+
     :param text: A YAML text. If not provided, filepath argument has to be provided.
     :param filepath: A path to a YAML file.
     :param ignore_schema: set to *True* to disable yaml validation.
     :param ignore_validation: set to *True* to disable statechart validation.
+    :param fast: set to *True* to use the C-accelerated loader and the dedicated validation.
+    :param cache_dir: an optional path to a directory used to cache YAML files.
     :return: a *Statechart* instance
     """
     if not text and not filepath:
@@ -66,19 +260,23 @@ def import_from_yaml(text: str=None, filepath: str=None, *, ignore_schema: bool=
         with open(filepath, 'r') as f:
             text = f.read()
 
-    if yaml.version_info < (0, 15):
-        data = yaml.safe_load(text)  # type: dict
-    else:
-        yml = yaml.YAML(typ='safe', pure=True)
-        data = yml.load(text)
+    use_cache = cache_dir is not None and filepath is not None and not ignore_schema
+    data = load_from_cache(cache_dir, filepath, text) if use_cache else None
 
-    if not ignore_schema:
-        try:
-            data = schema.Schema(SCHEMA.statechart).validate(data)
-        except schema.SchemaError as e:
-            raise StatechartError('YAML validation failed') from e
+    if data is None:
+        if yaml.version_info < (0, 15):
+            data = yaml.safe_load(text)  # type: dict
+        else:
+            yml = yaml.YAML(typ='safe', pure=not fast)
+            data = yml.load(text)
 
-    sc = import_from_dict(data)
+        if not ignore_schema:
+            data = _validate_structure(data, fast=fast)
+
+        if use_cache:
+            store_in_cache(cache_dir, filepath, text, data)
+
+    sc = import_from_dict(data, consume=True)
 
     if not ignore_validation:
         sc.validate()
@@ -90,12 +288,17 @@ def export_to_yaml(statechart: Statechart, filepath: str=None) -> str:
     Export given *Statechart* instance to YAML. Its YAML representation is returned by this function.
     Automatically save the output to filepath, if provided.
 
+    The C-accelerated emitter of ruamel.yaml is used if it is available.
+
     :param statechart: statechart to export
     :param filepath: save output to given filepath, if provided
     :return: A textual YAML representation
     """
-    output = yaml.dump(export_to_dict(statechart, ordered=False),
-                       width=1000, default_flow_style=False)
+    data = export_to_dict(statechart, ordered=False)
+    try:
+        output = yaml.dump(data, Dumper=_Dumper, width=_WIDTH, default_flow_style=False)
+    except _FoldedScalar:
+        output = yaml.dump(data, width=_WIDTH, default_flow_style=False)
 
     if filepath:
         with open(filepath, 'w') as f:
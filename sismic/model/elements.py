@@ -1,20 +1,154 @@
 from abc import ABCMeta
-from typing import List
+from collections.abc import MutableSequence
+from copy import deepcopy
+from typing import List, Optional, Sequence
 
 __all__ = ['ContractMixin', 'StateMixin', 'ActionStateMixin', 'TransitionStateMixin', 'CompositeStateMixin',
            'HistoryStateMixin', 'BasicState', 'CompoundState', 'OrthogonalState', 'ShallowHistoryState',
            'DeepHistoryState', 'FinalState', 'Transition']
 
 
+# Shared by the elements that have no condition
+_NO_CONDITIONS = ()  # type: tuple
+
+
+class _Conditions(MutableSequence):
+    """
+    View on the conditions of an element that has no condition (see *ContractMixin*).
+
+    Reading the view does not change the element. A list is created and stored by the element when
+    the view is modified for the first time, and the view then refers to this list, so that every view
+    and every reference obtained through the element reflect the same conditions.
+    """
+
+    __slots__ = ('_element', '_attribute')
+
+    def __init__(self, element: 'ContractMixin', attribute: str) -> None:
+        self._element = element
+        self._attribute = attribute
+
+    def _conditions(self) -> Sequence[str]:
+        return getattr(self._element, self._attribute)
+
+    def _list(self) -> List[str]:
+        conditions = self._conditions()
+        if conditions is _NO_CONDITIONS:
+            conditions = []
+            setattr(self._element, self._attribute, conditions)
+        return conditions  # type: ignore
+
+    def __len__(self):
+        return len(self._conditions())
+
+    def __iter__(self):
+        return iter(self._conditions())
+
+    def __getitem__(self, index):
+        return self._conditions()[index]
+
+    def __setitem__(self, index, value):
+        self._list()[index] = value
+
+    def __delitem__(self, index):
+        self._list().__delitem__(index)
+
+    def insert(self, index, value):
+        self._list().insert(index, value)
+
+    def append(self, value):
+        self._list().append(value)
+
+    def extend(self, values):
+        self._list().extend(values)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, _Conditions)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __reduce_ex__(self, protocol):
+        # Pickle and copy as a plain list
+        return list, (list(self),)
+
+    def __repr__(self):
+        return repr(list(self))
+
+# Values that are shared rather than copied by _deepcopy_element
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+def _deepcopy_element(element, memo):
+    """
+    Deep copy given element by copying its slots. Most attributes are strings or None, and are
+    shared with the copy, which is much faster than the generic implementation of *deepcopy*.
+    """
+    klass = type(element)
+    element_copy = klass.__new__(klass)
+    memo[id(element)] = element_copy
+
+    for cls in klass.__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            try:
+                value = getattr(element, name)
+            except AttributeError:
+                continue
+            if value is not _NO_CONDITIONS and not isinstance(value, _IMMUTABLE_TYPES):
+                value = deepcopy(value, memo)
+            setattr(element_copy, name, value)
+
+    if hasattr(element, '__dict__'):
+        element_copy.__dict__.update(deepcopy(element.__dict__, memo))
+    return element_copy
+
+
 class ContractMixin(metaclass=ABCMeta):
     """
     Mixin with a contract: preconditions, postconditions and invariants.
+
+    Conditions are exposed as lists. Elements without conditions share an empty tuple, and a list
+    is only created and kept by the element once a condition is added.
     """
 
+    __slots__ = ()
+
+    __deepcopy__ = _deepcopy_element
+
     def __init__(self) -> None:
-        self.preconditions = []  # type: List[str]
-        self.postconditions = []  # type: List[str]
-        self.invariants = []  # type: List[str]
+        self._preconditions = _NO_CONDITIONS  # type: Sequence[str]
+        self._postconditions = _NO_CONDITIONS  # type: Sequence[str]
+        self._invariants = _NO_CONDITIONS  # type: Sequence[str]
+
+    @property
+    def preconditions(self) -> List[str]:
+        conditions = self._preconditions
+        return _Conditions(self, '_preconditions') if conditions is _NO_CONDITIONS else conditions  # type: ignore
+
+    @preconditions.setter
+    def preconditions(self, conditions: List[str]) -> None:
+        self._preconditions = conditions._list() if isinstance(conditions, _Conditions) else conditions
+
+    @property
+    def postconditions(self) -> List[str]:
+        conditions = self._postconditions
+        return _Conditions(self, '_postconditions') if conditions is _NO_CONDITIONS else conditions  # type: ignore
+
+    @postconditions.setter
+    def postconditions(self, conditions: List[str]) -> None:
+        self._postconditions = conditions._list() if isinstance(conditions, _Conditions) else conditions
+
+    @property
+    def invariants(self) -> List[str]:
+        conditions = self._invariants
+        return _Conditions(self, '_invariants') if conditions is _NO_CONDITIONS else conditions  # type: ignore
+
+    @invariants.setter
+    def invariants(self, conditions: List[str]) -> None:
+        self._invariants = conditions._list() if isinstance(conditions, _Conditions) else conditions
 
     def __eq__(self, other):
         if isinstance(other, ContractMixin):
@@ -34,6 +168,10 @@ class StateMixin(metaclass=ABCMeta):
     :param name: name of the state
     """
 
+    __slots__ = ()
+
+    __deepcopy__ = _deepcopy_element
+
     def __init__(self, name: str) -> None:
         self._name = name
 
@@ -62,6 +200,8 @@ class ActionStateMixin(metaclass=ABCMeta):
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ()
+
     def __init__(self, on_entry: str=None, on_exit: str=None) -> None:
         self.on_entry = on_entry
         self.on_exit = on_exit
@@ -81,6 +221,8 @@ class TransitionStateMixin(metaclass=ABCMeta):
     A simple state can host transitions
     """
 
+    __slots__ = ()
+
     def __eq__(self, other):
         return isinstance(other, TransitionStateMixin)
 
@@ -90,6 +232,8 @@ class CompositeStateMixin(metaclass=ABCMeta):
     Composite state can have children states.
     """
 
+    __slots__ = ()
+
     def __eq__(self, other):
         return isinstance(other, CompositeStateMixin)
 
@@ -101,6 +245,8 @@ class HistoryStateMixin(metaclass=ABCMeta):
     :param memory: name of the initial state
     """
 
+    __slots__ = ()
+
     def __init__(self, memory: str=None) -> None:
         self.memory = memory
 
@@ -120,6 +266,8 @@ class BasicState(ContractMixin, StateMixin, ActionStateMixin, TransitionStateMix
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('_name', 'on_entry', 'on_exit', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -148,6 +296,8 @@ class CompoundState(ContractMixin, StateMixin, ActionStateMixin, TransitionState
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('_name', 'on_entry', 'on_exit', 'initial', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, initial: str=None, on_entry: str=None, on_exit: str=None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -178,6 +328,8 @@ class OrthogonalState(ContractMixin, StateMixin, ActionStateMixin, TransitionSta
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('_name', 'on_entry', 'on_exit', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -208,6 +360,9 @@ class ShallowHistoryState(ContractMixin, StateMixin, ActionStateMixin, HistorySt
     :param on_exit: code to execute when state is exited
     :param memory: name of the initial state
     """
+
+    __slots__ = ('_name', 'on_entry', 'on_exit', 'memory', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None, memory: str=None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -236,6 +391,9 @@ class DeepHistoryState(ContractMixin, StateMixin, ActionStateMixin, HistoryState
     :param on_exit: code to execute when state is exited
     :param memory: name of the initial state
     """
+
+    __slots__ = ('_name', 'on_entry', 'on_exit', 'memory', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None, memory: str=None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -263,6 +421,8 @@ class FinalState(ContractMixin, StateMixin, ActionStateMixin):
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('_name', 'on_entry', 'on_exit', '_preconditions', '_postconditions', '_invariants')
+
     def __init__(self, name: str, on_entry: str = None, on_exit: str = None) -> None:
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -286,6 +446,11 @@ class Transition(ContractMixin):
     A transition can be eventless (no event) or internal (no target).
     A condition (code as string) can be specified as a guard.
 
+    Transitions are compared by value. Their hash depends on their source and target, which are changed
+    when the transition is rotated or when a state is renamed: sets and mappings of transitions have to be
+    built again after such changes. When a transition is added to a statechart, it receives an
+    identifier (see *id*) that can be used to refer to this specific transition.
+
     :param source: name of the source state
     :param target: name of the target state (if transition is not internal)
     :param event: event name (if any)
@@ -294,6 +459,8 @@ class Transition(ContractMixin):
     :param priority: priority (default to 0)
     """
 
+    __slots__ = ('_source', '_target', 'event', 'guard', 'action', 'priority', '_id', '_preconditions', '_postconditions', '_invariants')
+
     LOW_PRIORITY = -1
     DEFAULT_PRIORITY = 0
     HIGH_PRIORITY = 1
@@ -306,6 +473,15 @@ class Transition(ContractMixin):
         self.guard = guard
         self.action = action
         self.priority = 0 if priority is None else priority
+        self._id = None  # type: Optional[int]
+
+    @property
+    def id(self) -> Optional[int]:
+        """
+        Identifier of this transition in the statechart it was added to, or None if it was not added to
+        a statechart. Identifiers are integers that are never reused in a statechart.
+        """
+        return self._id
 
     @property
     def source(self):
@@ -330,15 +506,17 @@ class Transition(ContractMixin):
         return self.event is None
 
     def __eq__(self, other):
-        if isinstance(other, Transition):
+        if self is other:
+            return True
+        elif isinstance(other, Transition):
             return (
-                ContractMixin.__eq__(self, other)
-                and self.source == other.source
+                self.source == other.source
                 and self.target == other.target
                 and self.event == other.event
                 and self.guard == other.guard
                 and self.action == other.action
                 and self.priority == other.priority
+                and ContractMixin.__eq__(self, other)
             )
         else:
             return NotImplemented
@@ -356,4 +534,4 @@ class Transition(ContractMixin):
         )
 
     def __hash__(self):
-        return hash(self.source)
+        return hash((self._source, self._target, self.event))
@@ -1,5 +1,8 @@
+import hashlib
+
+from collections import OrderedDict
 from copy import deepcopy
-from typing import Callable, Dict, Iterable, List, Optional, Union, cast
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union, cast
 
 from ..exceptions import StatechartError
 
@@ -9,6 +12,16 @@ from .elements import (CompositeStateMixin, CompoundState, HistoryStateMixin,
 __all__ = ['Statechart']
 
 
+def _remove_identical(items: List, item: object) -> None:
+    """
+    Remove given item from given list, comparing items by identity rather than by equality.
+    """
+    for i, other in enumerate(items):
+        if other is item:
+            del items[i]
+            return
+
+
 class Statechart:
     """
     Python structure for a statechart
@@ -26,9 +39,142 @@ class Statechart:
         self._states = {}  # type: Dict[str, StateMixin]
         self._parent = {}  # type: Dict[str, Optional[str]]
         self._children = {}  # type: Dict[Optional[str], List[str]]
-        self._transitions = []  # type: List[Transition]
+        # Transitions by identifier, in insertion order
+        self._transitions = OrderedDict()  # type: Dict[int, Transition]
+
+        # Transitions by source state, target state and event, in the order of self._transitions.
+        # Transitions by event are keyed by identifier, as many transitions can share an event.
+        self._transitions_from = {}  # type: Dict[str, List[Transition]]
+        self._transitions_to = {}  # type: Dict[str, List[Transition]]
+        self._transitions_with = {}  # type: Dict[Optional[str], Dict[int, Transition]]
 
         self._children[None] = []  # Root state
+        self._next_transition_id = 0
+
+        # Data computed from the structure of the statechart, see _changed
+        self._fingerprint = None  # type: Optional[str]
+        self._state_indexes = None  # type: Optional[Tuple[List[str], Dict[str, int]]]
+        self._subtrees = None  # type: Optional[Dict[str, Tuple[int, int]]]
+        self._events = None  # type: Optional[List[str]]
+
+        # Lookup tables of a frozen statechart, see freeze
+        self._frozen = False
+        self._ancestors = {}  # type: Dict[str, List[str]]
+        self._descendants = {}  # type: Dict[str, List[str]]
+
+    @classmethod
+    def from_elements(cls, name: str, states: Iterable[StateMixin], parents: Mapping[str, Optional[str]],
+                      transitions: Iterable[Transition], *, description: str=None,
+                      preamble: str=None) -> 'Statechart':
+        """
+        Create a statechart from given states and transitions.
+
+        This is equivalent to creating a statechart then calling *add_state* and *add_transition*
+        for each state and transition, except that states can be provided in any order, and that
+        all the checks are done in a single pass once all the elements are known. If some elements
+        are invalid, a single *StatechartError* is raised that reports all the errors, one per line.
+
+        :param name: Name of the statechart
+        :param states: states to add
+        :param parents: mapping from state names to the name of their parent, or None for the root state
+        :param transitions: transitions to add
+        :param description: optional description
+        :param preamble: code to execute to bootstrap the statechart
+        :return: a statechart
+        :raise StatechartError:
+        """
+        errors = []  # type: List[str]
+
+        # States
+        state_list = []  # type: List[StateMixin]
+        states_by_name = {}  # type: Dict[str, StateMixin]
+        for state in states:
+            if state.name is None:
+                errors.append('State {} must have a name'.format(state))
+            elif state.name in states_by_name:
+                errors.append('State {} already exists!'.format(state))
+            else:
+                states_by_name[state.name] = state
+                state_list.append(state)
+
+        for state_name in parents:
+            if state_name not in states_by_name:
+                errors.append('Parent is declared for unknown state {}'.format(state_name))
+
+        # Hierarchy
+        parent_by_name = {}  # type: Dict[str, Optional[str]]
+        children = {None: []}  # type: Dict[Optional[str], List[str]]
+        for state in state_list:
+            children[state.name] = []
+
+        for state in state_list:
+            state_name = state.name
+            if state_name not in parents:
+                errors.append('Parent of {} is not declared'.format(state))
+                continue
+
+            parent = parents[state_name] or None
+            if parent is None:
+                if len(children[None]) > 0:
+                    errors.append('Root already defined, {} should declare an existing parent state'.format(state))
+                    continue
+            else:
+                parent_state = states_by_name.get(parent, None)
+                if parent_state is None:
+                    errors.append('Parent "{}" of {} does not exist!'.format(parent, state))
+                    continue
+                if not isinstance(parent_state, CompositeStateMixin):
+                    errors.append('{} cannot be used as a parent for {}'.format(parent_state, state))
+                    continue
+                if isinstance(state, HistoryStateMixin) and not isinstance(parent_state, CompoundState):
+                    errors.append('{} cannot be used as a parent for {}'.format(parent_state, state))
+                    continue
+
+            parent_by_name[state_name] = parent
+            children[parent].append(state_name)
+
+        # Detect states that are not descendants of the root state (i.e., cycles)
+        if len(errors) == 0:
+            reachable = set(children[None])
+            states_to_consider = list(children[None])
+            while states_to_consider:
+                for child in children[states_to_consider.pop()]:
+                    reachable.add(child)
+                    states_to_consider.append(child)
+            for state in state_list:
+                if state.name not in reachable:
+                    errors.append('State {} is not a descendant of the root state'.format(state))
+
+        # Transitions
+        transition_list = list(transitions)
+        for transition in transition_list:
+            source = states_by_name.get(transition.source, None)
+            if source is None:
+                errors.append('Unknown source state for {}'.format(transition))
+            elif not isinstance(source, TransitionStateMixin):
+                errors.append('Cannot add {} on {}'.format(transition, source))
+            if transition.target is not None and transition.target not in states_by_name:
+                errors.append('Unknown target state for {}'.format(transition))
+
+        if len(errors) > 0:
+            raise StatechartError('\n'.join(errors))
+
+        statechart = cls(name, description=description, preamble=preamble)
+        statechart._states = states_by_name
+        statechart._parent = parent_by_name
+        statechart._children = children
+        statechart._transitions = OrderedDict()
+        statechart._transitions_from = {state.name: [] for state in state_list}
+        statechart._transitions_to = {state.name: [] for state in state_list}
+        for transition_id, transition in enumerate(transition_list):
+            transition._id = transition_id
+            statechart._transitions[transition_id] = transition
+            statechart._transitions_from[transition.source].append(transition)
+            if transition.target is not None:
+                statechart._transitions_to[transition.target].append(transition)
+            statechart._transitions_with.setdefault(transition.event, OrderedDict())[transition_id] = transition
+        statechart._next_transition_id = len(transition_list)
+        return statechart
 
     @property
     def root(self) -> Optional[str]:
@@ -50,6 +196,61 @@ class Statechart:
     def __repr__(self):
         return '{}({!r})'.format(self.__class__.__name__, self.name)
 
+    @property
+    def frozen(self) -> bool:
+        """
+        True if this statechart is frozen and cannot be modified, see *freeze*.
+        """
+        return self._frozen
+
+    def freeze(self) -> 'Statechart':
+        """
+        Return a frozen copy of this statechart.
+
+        The statechart is validated and deep-copied, so later changes made on this statechart
+        do not affect the frozen one. The methods that modify a frozen statechart (e.g. *add_state*,
+        *rename_state*, *add_transition*, etc.) raise a *StatechartError*. The states and
+        transitions of a frozen statechart must not be modified directly either.
+
+        All the data computed from the structure of a frozen statechart (indexes, ancestors,
+        descendants, fingerprint, etc.) are computed once by this method,
+        so a frozen statechart can be shared by many interpreters, possibly in different threads.
+        If this statechart is already frozen, it is returned as is.
+
+        :return: a frozen statechart
+        :raise StatechartError: if the statechart is not valid
+        """
+        if self._frozen:
+            return self
+
+        self.validate()
+        statechart = deepcopy(self)  # type: Statechart
+        statechart._ancestors, statechart._descendants = {}, {}
+
+        for name in statechart._indexes()[0]:
+            statechart._ancestors[name] = statechart.ancestors_for(name)
+            statechart._descendants[name] = statechart.descendants_for(name)
+        statechart._subtree_ranges()
+        statechart.fingerprint()
+        statechart.events_for()
+
+        statechart._frozen = True
+        return statechart
+
+    def _changed(self) -> None:
+        """
+        Reset the data that are computed from the structure of this statechart.
+        Must be called by every method that modifies the statechart, before any modification.
+
+        :raise StatechartError: if the statechart is frozen
+        """
+        if self._frozen:
+            raise StatechartError('{} is frozen and cannot be modified'.format(self))
+        self._fingerprint = None
+        self._state_indexes = None
+        self._subtrees = None
+        self._events = None
+
     # ######### STATES ##########
 
     @property
@@ -57,7 +258,32 @@ class Statechart:
         """
         List of state names in lexicographic order.
         """
-        return sorted(self._states.keys())
+        return list(self._indexes()[0])
+
+    def _indexes(self) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Return the names of the states in lexicographic order, and a mapping from these names
+        to their index in this list. The result is shared and must not be modified.
+        """
+        if self._state_indexes is None:
+            names = sorted(self._states)
+            self._state_indexes = (names, {name: i for i, name in enumerate(names)})
+        return self._state_indexes
+
+    def index_for(self, name: str) -> int:
+        """
+        Return the index of given state, i.e. its position in *states*. Indexes are dense integers
+        that can be used to store data about states in arrays. They change when states are added,
+        removed or renamed.
+
+        :param name: a state name
+        :return: the index of the state
+        :raise StatechartError: if state does not exist
+        """
+        try:
+            return self._indexes()[1][name]
+        except KeyError as e:
+            raise StatechartError('State {} does not exist'.format(name)) from e
 
     def state_for(self, name: str) -> StateMixin:
         """
@@ -106,6 +332,9 @@ class Statechart:
         :return: state's ancestors
         :raise StatechartError: if state does not exist
         """
+        if self._frozen and name in self._ancestors:
+            return list(self._ancestors[name])
+
         self.state_for(name)  # Raise StatechartError if state does not exist
 
         ancestors = []
@@ -124,6 +353,9 @@ class Statechart:
         :return: state's descendants
         :raise StatechartError: if state does not exist
         """
+        if self._frozen and name in self._descendants:
+            return list(self._descendants[name])
+
         self.state_for(name)  # Raise StatechartError if state does not exist
 
         descendants = []
@@ -143,11 +375,37 @@ class Statechart:
         :return: state depth
         :raise StatechartError: if state does not exist
         """
+        if self._frozen and name in self._ancestors:
+            return len(self._ancestors[name]) + 1
+
         self.state_for(name)  # Raise StatechartError if state does not exist
 
         ancestors = self.ancestors_for(name)
         return len(ancestors) + 1
 
+    def _subtree_ranges(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Number the states in preorder, and return for each state the range of numbers of its
+        descendants-or-self, as a pair (its own number, number of its last descendant + 1).
+        A state *x* is a descendant-or-self of a state *y* iff start(y) <= start(x) < end(y).
+        The result is shared and must not be modified.
+        """
+        if self._subtrees is None:
+            subtrees = {}  # type: Dict[str, Tuple[int, int]]
+            counter = 0
+            stack = [(name, False) for name in self._children[None]]
+            while stack:
+                name, visited = stack.pop()
+                if visited:
+                    subtrees[name] = (subtrees[name][0], counter)
+                else:
+                    subtrees[name] = (counter, counter)
+                    counter += 1
+                    stack.append((name, True))
+                    stack.extend((child, False) for child in reversed(self._children[name]))
+            self._subtrees = subtrees
+        return self._subtrees
+
     def least_common_ancestor(self, name_first: str, name_second: str) -> Optional[str]:
         """
         Return the deepest common ancestor for *s1* and *s2*, or *None* if
@@ -197,11 +455,12 @@ class Statechart:
         """
         List of available transitions
         """
-        return list(self._transitions)
+        return list(self._transitions.values())
 
     def add_transition(self, transition: Transition) -> None:
         """
-        Register given transition and register it on the source state
+        Register given transition and register it on the source state.
+        The transition receives a new identifier (see *Transition.id*).
 
         :param transition: transition to add
         :raise StatechartError:
@@ -220,7 +479,33 @@ class Statechart:
         if transition.target is not None and transition.target not in self._states:
             raise StatechartError('Unknown target state for {}'.format(transition))
 
-        self._transitions.append(transition)
+        self._changed()
+        transition._id = self._next_transition_id
+        self._next_transition_id += 1
+        self._transitions[transition.id] = transition
+        self._transitions_from[transition.source].append(transition)
+        if transition.target is not None:
+            self._transitions_to[transition.target].append(transition)
+        self._transitions_with.setdefault(transition.event, OrderedDict())[transition.id] = transition
+
+    def _registered_transition(self, transition: Transition) -> Optional[Transition]:
+        """
+        Return the first registered transition that is equal to given one, or None.
+        """
+        for registered in self._transitions_from.get(getattr(transition, 'source', None), []):
+            if registered == transition:
+                return registered
+        return None
+
+    def _remove_from_events(self, transitions: Iterable[Transition]) -> None:
+        """
+        Remove given registered transitions from the index of transitions by event.
+        """
+        for transition in transitions:
+            with_event = self._transitions_with[transition.event]
+            del with_event[transition.id]
+            if len(with_event) == 0:
+                del self._transitions_with[transition.event]
 
     def remove_transition(self, transition: Transition) -> None:
         """
@@ -229,11 +514,17 @@ class Statechart:
         :param transition: a *Transition* instance
         :raise StatechartError: if transition is not registered
         """
-        try:
-            self._transitions.remove(transition)
-        except ValueError:
+        registered = self._registered_transition(transition)
+        if registered is None:
             raise StatechartError('Transition {} does not exist'.format(transition))
 
+        self._changed()
+        del self._transitions[registered.id]
+        _remove_identical(self._transitions_from[registered.source], registered)
+        if registered.target is not None:
+            _remove_identical(self._transitions_to[registered.target], registered)
+        self._remove_from_events([registered])
+
     def rotate_transition(self, transition: Transition, new_source: str='', new_target: Optional[str]='') -> None:
         """
         Rotate given transition.
@@ -250,24 +541,40 @@ class Statechart:
             raise ValueError('You must at least specify the new source or new target')
 
         # Check that transition exists
-        if transition not in self._transitions:
+        registered = self._registered_transition(transition)
+        if registered is None:
             raise StatechartError('Unknown transition {}'.format(transition))
 
-        # Rotate using source
+        # Check new source and new target
+        source = registered.source
         if new_source != '':
             new_source_state = self.state_for(new_source)
             if not isinstance(new_source_state, TransitionStateMixin):
                 raise StatechartError('{} cannot have transitions'.format(new_source_state))
             assert isinstance(new_source_state, StateMixin)
-            transition._source = new_source_state.name
+            source = new_source_state.name
 
-        # Rotate using target
+        target = registered.target
         if new_target != '':
-            if new_target is None:
-                transition._target = None
-            else:
-                new_target_state = self.state_for(new_target)
-                transition._target = new_target_state.name
+            target = None if new_target is None else self.state_for(new_target).name
+
+        self._changed()
+
+        # Rotate using source
+        if source != registered.source:
+            _remove_identical(self._transitions_from[registered.source], registered)
+            registered._source = source
+            self._transitions_from[source].append(registered)
+            self._transitions_from[source].sort(key=lambda t: t.id)
+
+        # Rotate using target
+        if target != registered.target:
+            if registered.target is not None:
+                _remove_identical(self._transitions_to[registered.target], registered)
+            registered._target = target
+            if target is not None:
+                self._transitions_to[target].append(registered)
+                self._transitions_to[target].sort(key=lambda t: t.id)
 
     def transitions_from(self, source: str) -> List[Transition]:
         """
@@ -279,11 +586,23 @@ class Statechart:
         """
         self.state_for(source)  # Raise StatechartError if state does not exist
 
-        transitions = []
-        for transition in self._transitions:
-            if transition.source == source:
-                transitions.append(transition)
-        return transitions
+        return list(self._transitions_from[source])
+
+    def outgoing_transitions_for(self, source: str) -> Sequence[Transition]:
+        """
+        Return the transitions whose source is given name, in the order of their identifiers.
+
+        Unlike *transitions_from*, the returned sequence is not a copy: it must not be modified,
+        and it is changed when transitions are added, removed or rotated.
+
+        :param source: name of source state
+        :return: a sequence of *Transition* instances
+        :raise StatechartError: if state does not exist
+        """
+        try:
+            return self._transitions_from[source]
+        except KeyError as e:
+            raise StatechartError('State {} does not exist'.format(source)) from e
 
     def transitions_to(self, target: str) -> List[Transition]:
         """
@@ -296,24 +615,23 @@ class Statechart:
         """
         self.state_for(target)  # Raise StatechartError if state does not exist
 
-        transitions = []
-        for transition in self._transitions:
-            if transition.target == target or (transition.target is None and transition.source == target):
-                transitions.append(transition)
-        return transitions
+        internal_transitions = [t for t in self._transitions_from[target] if t.internal]
+        if len(internal_transitions) == 0:
+            return list(self._transitions_to[target])
+        return sorted(self._transitions_to[target] + internal_transitions, key=lambda t: t.id)
 
     def transitions_with(self, event: str) -> List[Transition]:
         """
         Return the list of transitions that can be triggered by given event name.
 
+        Transitions are indexed by event when they are added. Changing the event of a transition
+        that is already part of the statechart is not supported.
+
         :param event: name of the event
         :return: a list of *Transition* instances
         """
-        transitions = []
-        for transition in self._transitions:
-            if transition.event == event:
-                transitions.append(transition)
-        return transitions
+        transitions = self._transitions_with.get(event, None)
+        return [] if transitions is None else list(transitions.values())
 
     # ######### EVENTS ##########
 
@@ -329,7 +647,9 @@ class Statechart:
         :return: A list of event names
         """
         if name_or_names is None:
-            states = list(self._states.keys())
+            if self._events is None:
+                self._events = sorted(event for event in self._transitions_with if event)
+            return list(self._events)
         elif isinstance(name_or_names, str):
             states = [name_or_names]
         else:
@@ -382,10 +702,32 @@ class Statechart:
                 raise StatechartError('{} cannot be used as a parent for {}'.format(parent_state, state))
 
         # Save state
+        self._changed()
         self._states[state.name] = state
         self._parent[state.name] = parent
         self._children[state.name] = []
         self._children[parent].append(state.name)
+        self._transitions_from[state.name] = []
+        self._transitions_to[state.name] = []
+
+    def _replace_references(self, name: str, new_name: Optional[str]) -> None:
+        """
+        Replace given state name by *new_name* in the *initial* property of its parent, and in the
+        *memory* property of its siblings. In a valid statechart, no other state refers to it.
+
+        :param name: name of a state
+        :param new_name: name to use instead, or None
+        """
+        parent = self._parent[name]
+        if parent is not None:
+            parent_state = self._states[parent]
+            if isinstance(parent_state, CompoundState) and parent_state.initial == name:
+                parent_state.initial = new_name
+
+        for sibling in self._children[parent]:
+            sibling_state = self._states[sibling]
+            if isinstance(sibling_state, HistoryStateMixin) and sibling_state.memory == name:
+                sibling_state.memory = new_name
 
     def remove_state(self, name: str) -> None:
         """
@@ -398,30 +740,41 @@ class Statechart:
         :param name: name of a state
         :raise StatechartError:
         """
-        state = self.state_for(name)
-
-        # Remove children
-        for child in list(self.children_for(state.name)):
-            self.remove_state(child)
-
-        # Remove transitions
-        for transition in list(self.transitions):  # Make a copy!
-            if transition.source == state.name or transition.target == state.name:
-                self.remove_transition(transition)
+        self.state_for(name)  # Raise StatechartError if state does not exist
+        self._changed()
+
+        names = [name] + self.descendants_for(name)
+        removed_names = set(names)
+
+        # Remove transitions, and unregister them from the states that are not removed
+        transitions = {}  # type: Dict[int, Transition]
+        for state_name in names:
+            for transition in self._transitions_from[state_name] + self._transitions_to[state_name]:
+                transitions[id(transition)] = transition
+        if len(transitions) > 0:
+            for transition in transitions.values():
+                del self._transitions[transition.id]
+            sources = {t.source for t in transitions.values()}.difference(removed_names)
+            targets = {t.target for t in transitions.values() if t.target is not None}.difference(removed_names)
+            for source in sources:
+                self._transitions_from[source] = [
+                    t for t in self._transitions_from[source] if id(t) not in transitions]
+            for target in targets:
+                self._transitions_to[target] = [
+                    t for t in self._transitions_to[target] if id(t) not in transitions]
+            self._remove_from_events(transitions.values())
 
         # Remove compoundstate's initial and historystate's memory
-        for o_state in self._states.values():
-            if isinstance(o_state, CompoundState):
-                o_state.initial = None
-            elif isinstance(o_state, HistoryStateMixin):
-                o_state.memory = None
-
-        # Remove state
-        self._states.pop(name)
-        parent = self._parent.pop(name)
-        self._children.pop(name)
+        self._replace_references(name, None)
 
-        self._children[parent].remove(name)
+        # Remove state and its descendants
+        self._children[self._parent[name]].remove(name)
+        for state_name in names:
+            self._states.pop(state_name)
+            self._parent.pop(state_name)
+            self._children.pop(state_name)
+            self._transitions_from.pop(state_name)
+            self._transitions_to.pop(state_name)
 
     def rename_state(self, old_name: str, new_name: str) -> None:
         """
@@ -437,31 +790,30 @@ class Statechart:
 
         # Check state exists
         state = self.state_for(old_name)
+        self._changed()
 
         # Change transitions
-        for transition in self.transitions:
-            if transition.source == old_name:
-                if transition.internal:
-                    transition._target = new_name
-                transition._source = new_name
-
-            if transition.target == old_name:
+        transitions_from = self._transitions_from.pop(old_name)
+        transitions_to = self._transitions_to.pop(old_name)
+        for transition in transitions_from:
+            if transition.internal:
                 transition._target = new_name
+                transitions_to.append(transition)
+            transition._source = new_name
+
+        for transition in transitions_to:
+            transition._target = new_name
+        transitions_to.sort(key=lambda t: t.id)
 
-        for other_state in self._states.values():
-            # Change initial (CompoundState)
-            if isinstance(other_state, CompoundState):
-                if other_state.initial == old_name:
-                    other_state.initial = new_name
+        self._transitions_from[new_name] = transitions_from
+        self._transitions_to[new_name] = transitions_to
 
-            # Change memory (HistoryState)
-            if isinstance(other_state, HistoryStateMixin):
-                if other_state.memory == old_name:
-                    other_state.memory = new_name
+        # Change initial (CompoundState) and memory (HistoryState)
+        self._replace_references(old_name, new_name)
 
-            # Adapt parent
-            if self._parent[other_state.name] == old_name:
-                self._parent[other_state.name] = new_name
+        # Adapt parent
+        for child in self._children[old_name]:
+            self._parent[child] = new_name
 
         # Adapt structures
         parent_name = self._parent[old_name]
@@ -491,9 +843,14 @@ class Statechart:
         self.state_for(new_parent)
 
         # Check that parent is not a descendant (or self) of given state
-        if new_parent in [name] + self.descendants_for(name):
+        if new_parent == name or name in self.ancestors_for(new_parent):
             raise StatechartError('State {} cannot be moved into itself or one of its descendants.'.format(state))
 
+        self._changed()
+
+        # Change initial (CompoundState) and memory (HistoryState)
+        self._replace_references(name, None)
+
         # Change its parent and register state as a child
         old_parent = self.parent_for(name)
         self._parent[name] = new_parent
@@ -504,17 +861,6 @@ class Statechart:
         if isinstance(state, HistoryStateMixin):
             state.memory = None
 
-        for other_state in self._states.values():
-            # Change initial (CompoundState)
-            if isinstance(other_state, CompoundState):
-                if other_state.initial == name:
-                    other_state.initial = None
-
-            # Change memory (HistoryState)
-            if isinstance(other_state, HistoryStateMixin):
-                if other_state.memory == name:
-                    other_state.memory = None
-
     def copy_from_statechart(self, statechart: 'Statechart', *, source: str, replace: str,
                              renaming_func: Callable[[str], str]=lambda s: s) -> None:
         """
@@ -530,6 +876,9 @@ class Statechart:
         If necessary, callable *renaming_func* can be provided. This function should accept a (state) name and return a
         (new state) name. Use *renaming_func* to avoid conflicting names in target statechart.
 
+        Only the copied states and transitions are cloned, and *statechart* is left unchanged.
+        Current statechart is not modified if a *StatechartError* is raised.
+
         :param statechart: Source statechart from which states will be copied.
         :param source: Name of the source state.
         :param replace: Name of the target state. Should refer to a StateMixin with no child.
@@ -538,31 +887,93 @@ class Statechart:
         if len(self.children_for(replace)) > 0:
             raise StatechartError('State {} cannot be replaced while it has children.'.format(replace))
 
-        statechart_copy = deepcopy(statechart)  # type: Statechart
-
-        # Rename and copy states
-        statechart_copy.rename_state(source, replace)
-        source_name = replace  # For lisibility
-        self._states[replace] = statechart_copy.state_for(source_name)
-        for name in statechart_copy.descendants_for(source_name):
+        # New names of the copied states
+        names = [source] + statechart.descendants_for(source)
+        new_names = {source: replace}  # type: Dict[str, str]
+        used_names = set()  # type: Set[str]
+        for name in names[1:]:
             new_name = renaming_func(name)
-            # May raise a StatechartError if names collides in source statechart.
-            # Possible workaround: first rename all states to uid, then rename to new names
-            statechart_copy.rename_state(name, new_name)
-            self.add_state(statechart_copy.state_for(new_name), statechart_copy.parent_for(new_name))
+            if new_name in self._states or new_name in used_names:
+                raise StatechartError('State {} already exists!'.format(new_name))
+            new_names[name] = new_name
+            used_names.add(new_name)
+
+        # Involved transitions, in the order in which they were added
+        transitions = {}  # type: Dict[int, Transition]
+        for name in names:
+            for transition in statechart._transitions_from[name] + statechart._transitions_to[name]:
+                if transition.source not in new_names or (
+                        transition.target is not None and transition.target not in new_names):
+                    raise StatechartError(
+                        'Cannot copy {} because transition {} is not contained in {}'.format(transition.source, transition, source)
+                    )
+                transitions[id(transition)] = transition
+
+        self._changed()
+
+        # Copy states
+        for name in names:
+            state = deepcopy(statechart.state_for(name))  # type: StateMixin
+            state._name = new_names[name]
+            if isinstance(state, CompoundState) and state.initial in new_names:
+                state.initial = new_names[state.initial]
+            if isinstance(state, HistoryStateMixin) and state.memory in new_names:
+                state.memory = new_names[state.memory]
+
+            if name == source:
+                self._states[replace] = state
+            else:
+                parent = new_names[cast(str, statechart.parent_for(name))]
+                self._states[state.name] = state
+                self._parent[state.name] = parent
+                self._children[state.name] = []
+                self._children[parent].append(state.name)
+                self._transitions_from[state.name] = []
+                self._transitions_to[state.name] = []
 
         # Copy transitions
-        transitions = set()
-        for name in [source_name] + statechart_copy.descendants_for(source_name):
-            transitions.update(statechart_copy.transitions_from(name))
-            transitions.update(statechart_copy.transitions_to(name))
-        for transition in transitions:
-            try:
-                self.add_transition(transition)
-            except StatechartError as e:
-                raise StatechartError(
-                    'Cannot copy {} because transition {} is not contained in {}'.format(transition.source, transition, source)
-                ) from e
+        for transition in sorted(transitions.values(), key=lambda t: t.id):
+            transition = deepcopy(transition)
+            transition._source = new_names[transition.source]
+            if transition.target is not None:
+                transition._target = new_names[transition.target]
+            self.add_transition(transition)
+
+    # ######### FINGERPRINT ##########
+
+    def fingerprint(self) -> str:
+        """
+        Return a hash of the content of this statechart: its preamble, its states (including their
+        type, parent, code and contracts) and its transitions (including their code and contracts).
+        The name and the description of the statechart are not taken into account, nor the order in
+        which states and transitions were added. The hash is the same across processes and executions.
+
+        The fingerprint is computed once, and is reset by the methods that modify the statechart
+        (e.g. *add_state*, *add_transition*, *rename_state*, etc.). Changes that are directly made
+        on states or transitions are not detected.
+
+        :return: an hexadecimal string
+        """
+        if self._fingerprint is None:
+            states = []
+            for name in sorted(self._states):
+                state = self._states[name]
+                states.append(repr((
+                    name, type(state).__name__, self._parent[name],
+                    getattr(state, 'on_entry', None), getattr(state, 'on_exit', None),
+                    getattr(state, 'initial', None), getattr(state, 'memory', None),
+                    getattr(state, 'preconditions', None), getattr(state, 'postconditions', None),
+                    getattr(state, 'invariants', None),
+                )))
+
+            transitions = sorted(repr((
+                t.source, t.target, t.event, t.guard, t.action, t.priority,
+                t.preconditions, t.postconditions, t.invariants,
+            )) for t in self._transitions.values())
+
+            content = repr((self._preamble, states, transitions))
+            self._fingerprint = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return self._fingerprint
 
     # ######### VALIDATION ##########
 
@@ -0,0 +1,265 @@
+import mmap
+import os
+import struct
+
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Type, Union
+
+from .interpreter import Interpreter
+from .model import Statechart
+
+__all__ = ['SnapshotStore']
+
+
+# Magic number at the beginning of a store, followed by the fingerprint of the statechart and a newline
+_MAGIC = b'SISMIC-STORE-2\n'
+
+# Header of a record: length of the session identifier and length of the snapshot
+_HEADER = struct.Struct('<II')
+
+
+class SnapshotStore:
+    """
+    An append-only file of interpreter snapshots (see *Interpreter.snapshot*) for a given statechart,
+    keyed by session identifiers.
+
+    Each record of the file is made of a session identifier and a snapshot. When a session is stored
+    several times, the latest record wins. Records are written in batches (see *put_many* and *checkpoint*),
+    and are read through a memory-mapped view of the file. When a store is opened, only the position of
+    the latest record of each session is loaded. Interpreters are restored lazily, the first time they
+    are accessed with *get*, and are kept in memory until they are released (see *checkpoint*).
+
+    The fingerprint of the statechart (see *Statechart.fingerprint*) is written at the beginning of the file,
+    and a store cannot be opened for a statechart whose fingerprint is different.
+
+    Since the file is append-only, it grows each time a session is stored. Use *compact* to
+    rewrite it with the latest record of each session only.
+
+    A store can be used as a context manager, in which case it is closed on exit.
+
+    :param path: path to the file, created if it does not exist
+    :param statechart: statechart for which the snapshots were made
+    :param interpreter_klass: the class used to restore interpreters, default to Interpreter
+    :param kwargs: additional parameters for *Interpreter.restore* (e.g. *evaluator_klass*)
+    :raise ValueError: if the file is not a snapshot store, or if it was created for another statechart
+    """
+
+    def __init__(self, path: str, statechart: Statechart, *,
+                 interpreter_klass: Type[Interpreter]=Interpreter, **kwargs: Any) -> None:
+        self._path = path
+        self._statechart = statechart
+        self._interpreter_klass = interpreter_klass
+        self._kwargs = kwargs
+
+        # Position and length of the latest snapshot of each session
+        self._index = {}  # type: Dict[str, Tuple[int, int]]
+        # Interpreters that were restored or stored
+        self._interpreters = {}  # type: Dict[str, Interpreter]
+
+        self._header = _MAGIC + statechart.fingerprint().encode('ascii') + b'\n'
+
+        self._file = open(path, 'a+b')
+        self._map = None  # type: Optional[mmap.mmap]
+        self._size = 0
+        self._load()
+
+    def _load(self) -> None:
+        """
+        Build the index of the store, ignoring a possibly truncated last record.
+        """
+        self._size = os.fstat(self._file.fileno()).st_size
+        if self._size == 0:
+            self._append(self._header)
+            return
+
+        view = self._view()
+        if view[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError('{} is not a snapshot store'.format(self._path))
+        if view[:len(self._header)] != self._header:
+            self.close()
+            raise ValueError('{} was not created for statechart {}'.format(self._path, self._statechart.name))
+
+        position = len(self._header)
+        while position + _HEADER.size <= self._size:
+            key_length, data_length = _HEADER.unpack_from(view, position)
+            start = position + _HEADER.size + key_length
+            end = start + data_length
+            if end > self._size:
+                break
+
+            session = view[position + _HEADER.size:start].decode('utf-8')
+            if data_length == 0:
+                self._index.pop(session, None)
+            else:
+                self._index[session] = (start, data_length)
+            position = end
+
+        if position < self._size:
+            # Incomplete record, e.g. after a crash
+            self._close_view()
+            self._file.truncate(position)
+            self._size = position
+
+    def _view(self) -> mmap.mmap:
+        """
+        Return a memory-mapped view of the whole file.
+        """
+        if self._map is None or len(self._map) < self._size:
+            self._close_view()
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _close_view(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _append(self, data: bytes) -> int:
+        """
+        Append given data to the file.
+
+        :param data: data to append
+        :return: position of the data in the file
+        """
+        position = self._size
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        return position
+
+    def __contains__(self, session: object) -> bool:
+        return session in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def snapshot_for(self, session: str) -> bytes:
+        """
+        Return the latest snapshot stored for given session.
+
+        :param session: a session identifier
+        :return: a snapshot
+        :raise KeyError: if session is not in this store
+        """
+        position, length = self._index[session]
+        return self._view()[position:position + length]
+
+    def get(self, session: str) -> Interpreter:
+        """
+        Return the interpreter of given session, restoring it if needed.
+
+        :param session: a session identifier
+        :return: an interpreter
+        :raise KeyError: if session is not in this store
+        """
+        interpreter = self._interpreters.get(session, None)
+        if interpreter is None:
+            snapshot = self.snapshot_for(session)
+            interpreter = self._interpreter_klass.restore(self._statechart, snapshot, **self._kwargs)
+            self._interpreters[session] = interpreter
+        return interpreter
+
+    __getitem__ = get
+
+    def put(self, session: str, interpreter: Union[Interpreter, bytes]) -> None:
+        """
+        Store given interpreter (or snapshot) for given session.
+
+        :param session: a session identifier
+        :param interpreter: an interpreter or a snapshot
+        """
+        self.put_many([(session, interpreter)])
+
+    def put_many(self, items: Iterable[Tuple[str, Union[Interpreter, bytes]]]) -> None:
+        """
+        Store given interpreters (or snapshots) using a single write.
+
+        :param items: pairs (session identifier, interpreter or snapshot)
+        """
+        buffer = bytearray()
+        positions = []
+
+        for session, interpreter in items:
+            if isinstance(interpreter, Interpreter):
+                self._interpreters[session] = interpreter
+                snapshot = interpreter.snapshot()
+            else:
+                self._interpreters.pop(session, None)
+                snapshot = interpreter
+
+            key = session.encode('utf-8')
+            buffer += _HEADER.pack(len(key), len(snapshot))
+            buffer += key
+            positions.append((session, len(buffer), len(snapshot)))
+            buffer += snapshot
+
+        if len(buffer) > 0:
+            position = self._append(buffer)
+            for session, offset, length in positions:
+                self._index[session] = (position + offset, length)
+
+    def remove(self, session: str) -> None:
+        """
+        Remove given session from this store.
+
+        :param session: a session identifier
+        :raise KeyError: if session is not in this store
+        """
+        del self._index[session]
+        self._interpreters.pop(session, None)
+
+        key = session.encode('utf-8')
+        self._append(_HEADER.pack(len(key), 0) + key)
+
+    def checkpoint(self, *, release: bool=False) -> None:
+        """
+        Store all the interpreters that were restored or stored, using a single write.
+
+        :param release: set to True to release these interpreters from memory.
+        """
+        self.put_many(list(self._interpreters.items()))
+        if release:
+            self._interpreters.clear()
+
+    def compact(self) -> None:
+        """
+        Rewrite the file with the latest record of each session only.
+        Interpreters that are in memory are not stored (see *checkpoint*).
+        """
+        view = self._view()
+        temporary = self._path + '.tmp'
+
+        with open(temporary, 'wb') as f:
+            f.write(self._header)
+            for session, (position, length) in self._index.items():
+                key = session.encode('utf-8')
+                f.write(_HEADER.pack(len(key), length))
+                f.write(key)
+                f.write(view[position:position + length])
+
+        self._close_view()
+        self._file.close()
+        os.replace(temporary, self._path)
+
+        self._index.clear()
+        self._file = open(self._path, 'a+b')
+        self._load()
+
+    def close(self) -> None:
+        """
+        Close the underlying file. Interpreters that are in memory are not stored (see *checkpoint*).
+        """
+        self._close_view()
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(self.__class__.__name__, self._path, self._statechart)
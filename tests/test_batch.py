@@ -0,0 +1,96 @@
+import pytest
+
+from collections import Counter
+from functools import partial
+
+from sismic.batch import ScriptResult, run_scripts
+from sismic.interpreter import Event, Interpreter
+from sismic.io import import_from_yaml
+
+
+ELEVATOR = 'docs/examples/elevator/elevator.yaml'
+
+
+def _count_violations(acc, result):
+    return acc + (result.violation is not None)
+
+
+class TestRunScripts:
+    @pytest.fixture()
+    def statechart(self):
+        return import_from_yaml(filepath=ELEVATOR)
+
+    @pytest.fixture()
+    def scripts(self):
+        return [
+            [],
+            [Event('floorSelected', floor=4)],
+            [Event('floorSelected', floor=4), (10, 'not_an_event')],
+        ]
+
+    def test_results(self, statechart, scripts):
+        results = run_scripts(statechart, scripts, max_workers=2, chunksize=1)
+
+        assert len(results) == 3
+        assert all(isinstance(result, ScriptResult) for result in results)
+        assert all(result.violation is None for result in results)
+
+        expected = Interpreter(statechart)
+        expected.queue(Event('floorSelected', floor=4)).execute()
+        assert results[1].configuration == expected.configuration
+
+    def test_coverage(self, statechart, scripts):
+        results = run_scripts(statechart, scripts, max_workers=1)
+
+        assert results[0].processed_transitions == Counter()
+        assert results[2].entered_states['movingDown'] == 4
+        assert results[2].exited_states['movingUp'] == 4
+
+        transitions = statechart.transitions
+        processed = {transitions[i] for i in results[1].processed_transitions}
+        assert statechart.transitions_from('floorSelecting')[0] in processed
+
+    def test_scripts_are_consumed_lazily(self, statechart):
+        consumed = []
+
+        def scripts():
+            for i in range(20):
+                consumed.append(i)
+                yield [Event('floorSelected', floor=i % 5)]
+
+        def reducer(acc, result):
+            return acc + [len(consumed)]
+
+        consumed_at_reduction = run_scripts(statechart, scripts(), reducer, [], max_workers=1, chunksize=1)
+        assert len(consumed_at_reduction) == 20
+        assert consumed_at_reduction[0] <= 3
+
+    def test_order_of_results(self, statechart):
+        scripts = [[Event('floorSelected', floor=i % 5)] for i in range(12)]
+        results = run_scripts(statechart, scripts, max_workers=2, chunksize=1)
+
+        for i, result in enumerate(results):
+            expected = Interpreter(statechart)
+            expected.queue(Event('floorSelected', floor=i % 5)).execute()
+            assert result.configuration == expected.configuration
+            assert result.entered_states == results[i % 5].entered_states
+
+    def test_from_filepath(self, scripts):
+        results = run_scripts(ELEVATOR, scripts, max_workers=1)
+        assert len(results) == 3
+
+    def test_reducer(self, statechart, scripts):
+        assert run_scripts(statechart, scripts, _count_violations, 0, max_workers=2) == 0
+
+    def test_violation(self, statechart, scripts):
+        statechart.state_for('movingUp').invariants.append('False')
+
+        assert run_scripts(statechart, scripts, _count_violations, 0, max_workers=2) == 2
+        results = run_scripts(statechart, scripts, max_workers=1)
+        assert results[1].violation == ('InvariantError', "BasicState('movingUp')", 'False')
+
+    def test_interpreter_klass(self, statechart, scripts):
+        statechart.state_for('movingUp').invariants.append('False')
+        klass = partial(Interpreter, ignore_contract=True)
+
+        assert run_scripts(statechart, scripts, _count_violations, 0, interpreter_klass=klass, max_workers=2) == 0
@@ -1,9 +1,11 @@
+import pickle
 import pytest
 
 from sismic import code
-from sismic.code.python import FrozenContext
+from sismic.code.python import FrozenContext, TrackedContext
 from sismic.exceptions import CodeEvaluationError
 from sismic.interpreter import Event, InternalEvent, MetaEvent
+from sismic.model import Transition
 
 
 def test_dummy_evaluator(mocker):
@@ -113,3 +115,86 @@ class TestPythonEvaluator:
     @pytest.mark.xfail(reason='http://stackoverflow.com/questions/32894942/listcomp-unable-to-access-locals-defined-in-code-called-by-exec-if-nested-in-fun and possibly fixed with https://bugs.python.org/issue3692')
     def test_access_outer_scope(self, evaluator):
         evaluator._execute_code('d = [x for x in range(10) if x != a]', additional_context={'a': 1})
+
+    def test_time_constraints(self, evaluator):
+        assert evaluator.time_constraints(None) == []
+        assert evaluator.time_constraints('x == 1') == []
+        assert evaluator.time_constraints('after(3)') == [('after', 3)]
+        assert evaluator.time_constraints('x > 0 and (idle(1.5) or after(-1))') == [('idle', 1.5), ('after', -1)]
+
+    def test_unknown_time_constraints(self, evaluator):
+        assert evaluator.time_constraints('time > 3') is None
+        assert evaluator.time_constraints('after(x)') is None
+        assert evaluator.time_constraints('after(3) and idle') is None
+
+
+class TestTrackedContext:
+    def test_versions(self):
+        context = TrackedContext(x=1)
+        assert context.version_for('x') == 0
+
+        context['x'] = 2
+        context['y'] = 3
+        assert context.version_for('x') == 1
+        assert context.version_for('y') == 2
+
+        del context['x']
+        context.setdefault('y', 4)
+        context.setdefault('z', 4)
+        assert context.version_for('x') == 3
+        assert context.version_for('y') == 2
+        assert context.version_for('z') == 4
+
+    def test_serialisable(self):
+        context = TrackedContext(x=1)
+        context['y'] = 2
+
+        n_context = pickle.loads(pickle.dumps(context))
+        assert n_context == context
+        assert n_context.version_for('y') == 1
+
+
+class TestGuardCache:
+    @pytest.fixture
+    def evaluator(self, mocker):
+        interpreter = mocker.MagicMock(name='Interpreter')
+        interpreter.time = 0
+        interpreter.configuration = []
+
+        return code.PythonEvaluator(interpreter, initial_context={'x': 1, 'y': 2}, cache_guards=True)
+
+    def test_unchanged_guard_is_skipped(self, evaluator, mocker):
+        spy = mocker.spy(evaluator, '_evaluate_code')
+        transition = Transition('s', guard='x > 1')
+
+        assert not evaluator.evaluate_guard(transition)
+        assert not evaluator.evaluate_guard(transition)
+        assert spy.call_count == 1
+
+        evaluator._execute_code('y = 3')
+        assert not evaluator.evaluate_guard(transition)
+        assert spy.call_count == 1
+
+        evaluator._execute_code('x = 2')
+        assert evaluator.evaluate_guard(transition)
+        assert spy.call_count == 2
+
+    def test_guard_with_event(self, evaluator, mocker):
+        spy = mocker.spy(evaluator, '_evaluate_code')
+        transition = Transition('s', event='e', guard='x > 1')
+
+        assert not evaluator.evaluate_guard(transition, Event('e'))
+        assert not evaluator.evaluate_guard(transition, Event('e'))
+        assert spy.call_count == 2
+
+    def test_volatile_guard(self, evaluator, mocker):
+        spy = mocker.spy(evaluator, '_evaluate_code')
+        transition = Transition('s', guard='x > 1 and active("s")')
+
+        assert not evaluator.evaluate_guard(transition)
+        assert not evaluator.evaluate_guard(transition)
+        assert spy.call_count == 2
+
+    def test_names_in_nested_code(self, evaluator):
+        assert evaluator._names_for('any(x > 1 for _ in [0])') >= {'x', 'any'}
+        assert evaluator._names_for('(lambda: time)()') is None
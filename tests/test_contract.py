@@ -71,3 +71,50 @@ def test_do_not_raise(elevator):
     transitions[0].postconditions.append('False')
 
     elevator.queue('floorSelected', floor=4).execute()
+
+
+class TestLazyInvariants:
+    @pytest.fixture()
+    def interpreter(self, elevator):
+        interpreter = Interpreter(elevator.statechart, lazy_invariants=True)
+        interpreter.execute()
+        return interpreter
+
+    def test_skipped_on_empty_steps(self, interpreter, mocker):
+        spy = mocker.spy(interpreter._evaluator, 'evaluate_invariants')
+
+        assert interpreter.execute_once() is None
+        assert spy.call_count == 0
+
+    def test_evaluated_on_steps(self, interpreter, mocker):
+        spy = mocker.spy(interpreter._evaluator, 'evaluate_invariants')
+        interpreter.queue('floorSelected', floor=4)
+
+        assert interpreter.execute_once() is not None
+        assert spy.call_count > 0
+
+    def test_time_dependent_invariants(self, elevator):
+        elevator.statechart.state_for('doorsOpen').invariants.append('not after(5)')
+        interpreter = Interpreter(elevator.statechart, lazy_invariants=True)
+        interpreter.execute()
+
+        interpreter.clock.time = 10
+        with pytest.raises(InvariantError):
+            interpreter.execute_once()
+
+    def test_invariants_added_during_execution(self, elevator):
+        interpreter = Interpreter(elevator.statechart, lazy_invariants=True)
+        interpreter.execute()
+        assert interpreter.execute_once() is None
+
+        elevator.statechart.state_for('doorsOpen').invariants.append('not after(5)')
+        interpreter.clock.time = 10
+        with pytest.raises(InvariantError):
+            interpreter.execute_once()
+
+    def test_not_lazy_by_default(self, elevator, mocker):
+        elevator.execute()
+        spy = mocker.spy(elevator._evaluator, 'evaluate_invariants')
+
+        assert elevator.execute_once() is None
+        assert spy.call_count == len(elevator.configuration)
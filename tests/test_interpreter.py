@@ -1,13 +1,17 @@
 import pytest
 import pickle
+import random
 
 from collections import Counter
+from functools import partial
 
-from sismic.exceptions import ExecutionError, NonDeterminismError, ConflictingTransitionsError
-from sismic.code import DummyEvaluator
+from sismic.exceptions import ExecutionError, NonDeterminismError, ConflictingTransitionsError, StatechartError
+from sismic.code import DummyEvaluator, PythonEvaluator
+from sismic.clock import UtcClock
 from sismic.interpreter import Interpreter, Event, InternalEvent
+from sismic.io import import_from_yaml
 from sismic.helpers import coverage_from_trace, log_trace, run_in_background
-from sismic.model import Transition, MacroStep, MicroStep, MetaEvent
+from sismic.model import Statechart, CompoundState, BasicState, Transition, MacroStep, MicroStep, MetaEvent
 from sismic import testing
 
 
@@ -430,6 +434,21 @@ class TestInterpreterWithNestedParallel:
 
         assert [t.source for t in step.transitions] == ['k1', 'x', 'y', 'z']
 
+    def test_compatible_transitions(self, interpreter):
+        # Compare the checks done on the whole list of transitions with the pairwise ones
+        states = sorted(interpreter.statechart.states, key=lambda s: s != 'root')
+        transitions = [Transition(source, target) for source in states[1:] for target in states + [None]]
+        generator = random.Random(42)
+
+        for _ in range(2000):
+            selected = generator.sample(transitions, generator.randint(2, 4))
+            try:
+                interpreter._check_transition_pairs(selected)
+            except (NonDeterminismError, ConflictingTransitionsError):
+                assert not interpreter._transitions_are_compatible(selected)
+            else:
+                assert interpreter._transitions_are_compatible(selected)
+
 
 class TestTransitionPriority:
     @pytest.fixture()
@@ -472,6 +491,303 @@ class TestTransitionPriority:
         assert interpreter.configuration == ['root', 'c']
 
 
+class TestSimulateUntil:
+    @pytest.fixture()
+    def interpreter(self):
+        return Interpreter(import_from_yaml(filepath='tests/yaml/timer.yaml'))
+
+    def test_timers(self, interpreter):
+        steps = interpreter.simulate_until(100)
+
+        assert [step.time for step in steps] == [0, 3, 5, 7]
+        assert interpreter.final
+        assert interpreter.time == 100
+        assert all(isinstance(step.time, int) for step in steps)
+
+    def test_no_idle_step(self, interpreter):
+        started = []
+        interpreter.attach(lambda e: started.append(e.time) if e.name == 'step started' else None)
+
+        interpreter.simulate_until(6)
+
+        assert interpreter.configuration == ['root', 's3']
+        assert interpreter.time == 6
+        assert started == [0, 0, 3, 3, 5, 5, 6]
+
+    def test_entry_and_idle_times(self, interpreter):
+        interpreter.simulate_until(4)
+        assert interpreter.entry_time_for('s2') == interpreter.idle_time_for('s2') == 3
+        assert interpreter.entry_time_for('root') == 0
+        assert interpreter.entry_time_for('s3') is None
+        with pytest.raises(StatechartError):
+            interpreter.entry_time_for('unknown')
+
+    def test_successive_calls(self, interpreter):
+        interpreter.simulate_until(4)
+        assert interpreter.configuration == ['root', 's2']
+
+        interpreter.simulate_until(8)
+        assert interpreter.final
+
+    def test_delayed_events(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+        interpreter.queue('goto s2', delay=12.5)
+
+        steps = interpreter.simulate_until(20)
+
+        assert [step.time for step in steps] == [0, 12.5, 12.5]
+        assert interpreter.configuration == ['root', 's3']
+
+    def test_events_after_horizon(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, evaluator_klass=DummyEvaluator)
+        interpreter.queue('goto s2', delay=30)
+
+        interpreter.simulate_until(20)
+        assert interpreter.configuration == ['root', 's1']
+
+        interpreter.simulate_until(30)
+        assert interpreter.configuration == ['root', 's3']
+
+    def test_unknown_time_constraints(self, interpreter):
+        interpreter.statechart.transitions_from('s1')[0].guard = 'time >= 2.5'
+
+        with pytest.raises(ExecutionError):
+            interpreter.simulate_until(10)
+
+    def test_unknown_time_constraints_with_step(self, interpreter):
+        interpreter.statechart.transitions_from('s1')[0].guard = 'time >= 2.5'
+
+        steps = interpreter.simulate_until(10, step=1)
+        assert [step.time for step in steps] == [0, 3, 5, 7]
+
+    def test_requires_simulated_clock(self, simple_statechart):
+        interpreter = Interpreter(simple_statechart, clock=UtcClock())
+
+        with pytest.raises(TypeError):
+            interpreter.simulate_until(10)
+
+
+def test_cache_guards(elevator):
+    evaluator_klass = partial(PythonEvaluator, cache_guards=True)
+    interpreter = Interpreter(elevator.statechart, evaluator_klass=evaluator_klass)
+
+    for i in (interpreter, elevator):
+        i.queue('floorSelected', floor=4)
+        i.execute()
+        i.clock.time = 10
+        i.execute()
+
+    assert interpreter.configuration == elevator.configuration
+    assert interpreter.context == elevator.context
+    assert interpreter.context['current'] == 0
+
+
+def test_statechart_modified_after_creation():
+    statechart = Statechart('test')
+    statechart.add_state(CompoundState('r', initial='a'), None)
+    statechart.add_state(BasicState('a'), 'r')
+    interpreter = Interpreter(statechart)
+    interpreter.execute()
+    assert interpreter.configuration == ['r', 'a']
+
+    statechart.add_state(BasicState('b'), 'r')
+    statechart.add_transition(Transition('a', 'b'))
+    interpreter.execute()
+    assert interpreter.configuration == ['r', 'b']
+    assert interpreter.snapshot()
+
+    statechart.remove_state('a')
+    assert interpreter.configuration == ['r', 'b']
+
+
+def test_frozen_statechart(elevator):
+    interpreter = Interpreter(elevator.statechart.freeze())
+
+    for i in (interpreter, elevator):
+        i.queue('floorSelected', floor=4)
+        i.execute()
+        i.clock.time = 10
+        i.execute()
+
+    assert interpreter.configuration == elevator.configuration
+    assert interpreter.context == elevator.context
+    assert interpreter.context['current'] == 0
+
+
+class TestFork:
+    @pytest.fixture()
+    def elevator(self, elevator):
+        elevator.execute()
+        elevator.queue('floorSelected', floor=4)
+        return elevator
+
+    def test_same_state(self, elevator):
+        fork = elevator.fork()
+
+        assert fork.statechart is elevator.statechart
+        assert fork.configuration == elevator.configuration
+        assert fork.context == elevator.context
+        assert fork.time == elevator.time
+
+    def test_same_execution(self, elevator):
+        fork = elevator.fork()
+
+        for i in (elevator, fork):
+            i.clock.time = 10
+            i.queue('floorSelected', floor=1)
+
+        assert len(fork.execute()) == len(elevator.execute())
+        assert fork.configuration == elevator.configuration
+        assert fork.context == elevator.context
+
+    def test_independent(self, elevator):
+        elevator.context['x'] = []
+        fork = elevator.fork()
+
+        fork.clock.time = 10
+        fork.context['x'].append(1)
+        fork.execute()
+
+        assert elevator.clock.time == 0
+        assert elevator.context['x'] == []
+        assert elevator.context['current'] == 0
+        assert fork.context['current'] == 4
+        assert elevator.context['destination'] == 0
+        assert len(elevator._external_queue) == 1
+
+    @pytest.mark.parametrize('cache_guards', [False, True])
+    def test_nested_values(self, elevator, cache_guards):
+        interpreter = Interpreter(elevator.statechart, evaluator_klass=partial(PythonEvaluator, cache_guards=cache_guards),
+                                  initial_context={'a': {'b': [1]}, 'big': list(range(1000))})
+        fork = interpreter.fork()
+        other_fork = fork.fork()
+
+        fork.context['a']['b'].append(2)
+        interpreter.context['a']['b'].append(3)
+        assert fork.context['a'] == {'b': [1, 2]}
+        assert interpreter.context['a'] == {'b': [1, 3]}
+        assert other_fork.context['a'] == {'b': [1]}
+
+        # Values are only copied when accessed
+        big = dict.__getitem__(interpreter.context, 'big')
+        assert dict.__getitem__(fork.context, 'big') is big
+        assert fork.context['big'] == big and fork.context['big'] is not big
+        assert interpreter.context['big'] is not big
+
+        # Values set after the fork are not copied
+        value = []
+        fork.context.update(x=value)
+        assert fork.context['x'] is value
+        assert dict(fork.context.items())['a'] == {'b': [1, 2]}
+
+    def test_listeners(self, elevator):
+        trace = log_trace(elevator)
+        fork = elevator.fork()
+        fork.execute()
+
+        assert trace == []
+
+    def test_cache_guards(self, elevator):
+        evaluator_klass = partial(PythonEvaluator, cache_guards=True)
+        interpreter = Interpreter(elevator.statechart, evaluator_klass=evaluator_klass)
+        interpreter.execute()
+
+        fork = interpreter.fork()
+        fork.queue('floorSelected', floor=4).execute()
+        interpreter.execute()
+
+        assert fork.context['current'] == 4
+        assert interpreter.context['current'] == 0
+        assert fork.context.version > interpreter.context.version
+
+    def test_dummy_evaluator(self, elevator):
+        interpreter = Interpreter(elevator.statechart, evaluator_klass=DummyEvaluator)
+        fork = interpreter.fork()
+
+        assert isinstance(fork._evaluator, DummyEvaluator)
+        assert fork._evaluator is not interpreter._evaluator
+
+
+class TestSnapshot:
+    @pytest.fixture()
+    def elevator(self, elevator):
+        elevator.execute()
+        elevator.queue('floorSelected', floor=4)
+        elevator.execute_once()
+        elevator.clock.time = 5
+        return elevator
+
+    def test_restore(self, elevator):
+        interpreter = Interpreter.restore(elevator.statechart, elevator.snapshot())
+
+        assert interpreter.configuration == elevator.configuration
+        assert interpreter.context == elevator.context
+        assert interpreter.time == elevator.time
+        assert interpreter.clock.time == 5
+        assert interpreter._entry_time == elevator._entry_time
+        assert interpreter._idle_time == elevator._idle_time
+        assert interpreter._memory == elevator._memory
+
+    def test_same_execution(self, elevator):
+        interpreter = Interpreter.restore(elevator.statechart, elevator.snapshot())
+
+        for i in (interpreter, elevator):
+            i.queue('floorSelected', floor=1)
+            i.clock.time = 20
+
+        assert len(interpreter.execute()) == len(elevator.execute())
+        assert interpreter.configuration == elevator.configuration
+        assert interpreter.context == elevator.context
+
+    def test_history(self, history_statechart):
+        interpreter = Interpreter(history_statechart)
+        interpreter.queue('next', 'pause').execute()
+
+        restored = Interpreter.restore(history_statechart, interpreter.snapshot())
+        assert restored._memory == interpreter._memory
+
+        for i in (interpreter, restored):
+            i.queue('continue').execute()
+        assert restored.configuration == interpreter.configuration == ['root', 'loop', 's2']
+
+    def test_queues(self, elevator):
+        elevator.queue('floorSelected', floor=2)
+        elevator._raise_event(InternalEvent('test'))
+        interpreter = Interpreter.restore(elevator.statechart, elevator.snapshot())
+
+        assert interpreter._external_queue == elevator._external_queue
+        assert interpreter._internal_queue == elevator._internal_queue
+
+    def test_kwargs(self, elevator):
+        clock = UtcClock()
+        interpreter = Interpreter.restore(elevator.statechart, elevator.snapshot(), clock=clock)
+
+        assert interpreter.clock is clock
+        assert interpreter.configuration == elevator.configuration
+
+    def test_mismatch(self, elevator, simple_statechart):
+        with pytest.raises(ValueError):
+            Interpreter.restore(simple_statechart, elevator.snapshot())
+
+    def test_mismatch_with_same_number_of_states(self, elevator):
+        snapshot = elevator.snapshot()
+        statechart = elevator.statechart
+        states = statechart.states
+
+        statechart.rename_state('doorsOpen', 'opened')
+        assert len(statechart.states) == len(states) and statechart.states != states
+        with pytest.raises(ValueError, match='does not match'):
+            Interpreter.restore(statechart, snapshot)
+
+        statechart.rename_state('opened', 'doorsOpen')
+        assert Interpreter.restore(statechart, snapshot).configuration == elevator.configuration
+
+    def test_version(self, elevator):
+        snapshot = pickle.dumps((0, ))
+        with pytest.raises(ValueError, match='version'):
+            Interpreter.restore(elevator.statechart, snapshot)
+
+
 class TestLogTrace:
     @pytest.fixture(autouse=True)
     def setup(self, elevator):
@@ -542,6 +858,15 @@ class TestCoverageFromTrace:
 
         assert coverage_from_trace(trace) == expected
 
+    def test_registered_transitions(self, elevator):
+        trace = log_trace(elevator)
+        elevator.queue('floorSelected', floor=1)
+        elevator.queue('floorSelected', floor=2)
+        elevator.execute()
+
+        transition = elevator.statechart.transitions_from('floorSelecting')[0]
+        assert coverage_from_trace(trace)['processed transitions'][transition] == 2
+
 
 class TestInterpreterBinding:
     @pytest.fixture()
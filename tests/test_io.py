@@ -1,9 +1,21 @@
+import builtins
+import copy
+import os
 import pytest
+import schema
 
-from sismic.model import Statechart
+from ruamel import yaml as ruamel_yaml
+
+from sismic.model import Statechart, Transition
 from sismic.exceptions import StatechartError
-from sismic.io import import_from_yaml, export_to_yaml, export_to_plantuml
+from sismic.io import import_from_yaml, export_to_yaml, export_to_plantuml, import_from_json, export_to_json, PlantUMLExporter
 from sismic.io.plantuml import cli
+from sismic.io.yaml import SCHEMA, _validate
+from sismic.io.datadict import import_from_dict, export_to_dict
+from sismic.io.bundle import import_from_bundle, export_to_bundle
+from sismic.code import PythonEvaluator
+from sismic.interpreter import Interpreter
+from sismic.helpers import coverage_from_trace, log_trace
 
 
 def compare_statecharts(s1, s2):
@@ -95,6 +107,138 @@ class TestImportFromYaml:
         assert 'root cannot declare both a "states" and a "parallel states" property' in str(e.value)
 
 
+class TestFastImport:
+    @pytest.mark.parametrize('filepath', [
+        os.path.join(directory, filename)
+        for directory in ('tests/yaml', 'docs/examples/elevator', 'docs/examples/microwave', 'docs/examples')
+        for filename in sorted(os.listdir(directory)) if filename.endswith('.yaml')
+    ])
+    def test_same_as_schema(self, filepath):
+        with open(filepath) as f:
+            data = ruamel_yaml.YAML(typ='safe', pure=True).load(f.read())
+
+        assert _validate(copy.deepcopy(data)) == schema.Schema(SCHEMA.statechart).validate(data)
+        compare_statecharts(import_from_yaml(filepath=filepath), import_from_yaml(filepath=filepath, fast=True))
+
+    def test_conversions(self):
+        data = {'statechart': {'name': 1, 'root state': {'name': 2, 'transitions': [
+            {'target': 3, 'priority': '4', 'contract': [{'before': True}]},
+            {'target': 3, 'priority': 'high', 'guard': None},
+        ]}}}
+
+        assert _validate(copy.deepcopy(data)) == schema.Schema(SCHEMA.statechart).validate(data)
+
+    @pytest.mark.parametrize('data', [
+        None,
+        {},
+        {'statechart': {'name': 's'}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r'}}, 'other': 1},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'unknown': 1}}},
+        {'statechart': {'name': 's', 'root state': {'initial': 'r'}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'type': 'initial'}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'states': 's1'}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'states': ['s1']}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'contract': [{}]}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'contract': [{'during': 'x'}]}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'transitions': {'target': 'r'}}}},
+        {'statechart': {'name': 's', 'root state': {'name': 'r', 'transitions': [{'priority': 'medium'}]}}},
+    ])
+    def test_invalid(self, data):
+        with pytest.raises(schema.SchemaError):
+            schema.Schema(SCHEMA.statechart).validate(copy.deepcopy(data))
+        with pytest.raises(schema.SchemaError):
+            _validate(data)
+
+    def test_validation_error(self):
+        with pytest.raises(StatechartError, match='YAML validation failed'):
+            import_from_yaml('statechart:\n  name: s\n', fast=True)
+
+
+class TestImportCache:
+    @pytest.fixture()
+    def filepath(self, tmpdir):
+        filepath = tmpdir.join('elevator.yaml')
+        with open('docs/examples/elevator/elevator.yaml') as f:
+            filepath.write(f.read())
+        return str(filepath)
+
+    @pytest.fixture()
+    def cache_dir(self, tmpdir):
+        return str(tmpdir.join('cache'))
+
+    def test_cache_is_used(self, filepath, cache_dir, mocker):
+        statechart = import_from_yaml(filepath=filepath, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 1
+
+        spy = mocker.spy(schema.Schema, 'validate')
+        cached = import_from_yaml(filepath=filepath, cache_dir=cache_dir)
+        assert spy.call_count == 0
+        compare_statecharts(statechart, cached)
+
+    def test_stale_entry(self, filepath, cache_dir):
+        import_from_yaml(filepath=filepath, cache_dir=cache_dir)
+        with open(filepath) as f:
+            text = f.read()
+        with open(filepath, 'w') as f:
+            f.write(text.replace('name: Elevator', 'name: Modified'))
+
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Modified'
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Modified'
+
+    def test_corrupted_entry(self, filepath, cache_dir):
+        import_from_yaml(filepath=filepath, cache_dir=cache_dir)
+        entry = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        with open(entry, 'wb') as f:
+            f.write(b'corrupted')
+
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+
+    def test_truncated_entry(self, filepath, cache_dir):
+        import_from_yaml(filepath=filepath, cache_dir=cache_dir)
+        entry = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        with open(entry, 'rb') as f:
+            content = f.read()
+        with open(entry, 'wb') as f:
+            f.write(content[:len(content) // 2])
+
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+
+    def test_read_only_cache_dir(self, filepath, cache_dir, mocker):
+        os.makedirs(cache_dir)
+        os.chmod(cache_dir, 0o500)
+        if os.access(cache_dir, os.W_OK):  # e.g. when running as root
+            mocker.patch('os.replace', side_effect=PermissionError)
+
+        try:
+            assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+            assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+        finally:
+            os.chmod(cache_dir, 0o700)
+        assert os.listdir(cache_dir) == []
+
+    def test_cache_dir_is_a_file(self, filepath, cache_dir):
+        with open(cache_dir, 'w'):
+            pass
+        assert import_from_yaml(filepath=filepath, cache_dir=cache_dir).name == 'Elevator'
+
+    def test_not_used_without_schema(self, filepath, cache_dir):
+        import_from_yaml(filepath=filepath, cache_dir=cache_dir, ignore_schema=True)
+        assert not os.path.exists(cache_dir)
+
+
+class TestImportFromDict:
+    def test_consume(self, example_from_docs):
+        data = export_to_dict(example_from_docs, ordered=False)
+        statechart = import_from_dict(copy.deepcopy(data), consume=True)
+
+        compare_statecharts(example_from_docs, statechart)
+        assert statechart.transitions == import_from_dict(data).transitions
+
+        import_from_dict(data, consume=True)
+        assert data == {'statechart': {}}
+
+
 class TestExportToYaml:
     def test_export_example_from_tests(self, example_from_tests):
         assert len(export_to_yaml(example_from_tests)) > 0
@@ -114,6 +258,116 @@ class TestExportToYaml:
     def test_identity_for_example_from_docs(self, example_from_docs):
         compare_statecharts(example_from_docs, import_from_yaml(export_to_yaml(example_from_docs)))
 
+    @pytest.mark.parametrize('value', [
+        'x = 1\ny = 2\n', "it's", "'a': 1", 'x\ty', 'ab\tcd ' * 300, 'a = "{}"\n'.format('b ' * 600),
+    ], ids=['multiline', 'quote', 'leading quote', 'tab', 'long', 'long multiline'])
+    def test_same_output_as_default_dumper(self, elevator, value):
+        statechart = elevator.statechart
+        statechart.state_for('doorsOpen').on_entry = value
+        expected = ruamel_yaml.dump(export_to_dict(statechart, ordered=False), width=1000, default_flow_style=False)
+        assert export_to_yaml(statechart) == expected
+
+    def test_transitions_are_grouped_once(self, elevator, mocker):
+        statechart = elevator.statechart
+        mocker.spy(statechart, 'transitions_from')
+        export_to_dict(statechart)
+        assert statechart.transitions_from.call_count == 0
+
+
+class TestJSON:
+    def test_identity_for_example_from_tests(self, example_from_tests):
+        compare_statecharts(example_from_tests, import_from_json(export_to_json(example_from_tests)))
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        compare_statecharts(example_from_docs, import_from_json(export_to_json(example_from_docs, indent=2)))
+
+    def test_fast(self, example_from_docs):
+        compare_statecharts(example_from_docs, import_from_json(export_to_json(example_from_docs), fast=True))
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.json'))
+        output = export_to_json(elevator.statechart, filepath)
+
+        with open(filepath) as f:
+            assert f.read() == output
+        compare_statecharts(elevator.statechart, import_from_json(filepath=filepath))
+
+    def test_args(self):
+        with pytest.raises(TypeError):
+            import_from_json()
+        with pytest.raises(TypeError):
+            import_from_json('A', filepath='B')
+
+    def test_validation(self):
+        with pytest.raises(StatechartError, match='JSON validation failed'):
+            import_from_json('{"statechart": {"name": "s"}}')
+
+
+class TestMessagePack:
+    @pytest.fixture(autouse=True)
+    def msgpack(self):
+        pytest.importorskip('msgpack')
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        from sismic.io.msgpack import import_from_msgpack, export_to_msgpack
+        compare_statecharts(example_from_docs, import_from_msgpack(export_to_msgpack(example_from_docs)))
+
+    def test_validation(self):
+        import msgpack
+        from sismic.io.msgpack import import_from_msgpack
+
+        with pytest.raises(StatechartError, match='MessagePack validation failed'):
+            import_from_msgpack(msgpack.packb({'statechart': {'name': 's'}}))
+
+
+class TestBundle:
+    @pytest.fixture(autouse=True)
+    def compiled_code(self, monkeypatch):
+        monkeypatch.setattr(PythonEvaluator, '_compiled_evaluable_code', {})
+        monkeypatch.setattr(PythonEvaluator, '_compiled_executable_code', {})
+
+    def test_identity_for_example_from_tests(self, example_from_tests):
+        compare_statecharts(example_from_tests, import_from_bundle(export_to_bundle(example_from_tests)))
+
+    def test_identity_for_example_from_docs(self, example_from_docs):
+        compare_statecharts(example_from_docs, import_from_bundle(export_to_bundle(example_from_docs)))
+
+    def test_compiled_code(self, elevator):
+        statechart = import_from_bundle(export_to_bundle(elevator.statechart))
+
+        assert statechart.preamble in PythonEvaluator._compiled_executable_code
+        assert 'destination != current' in PythonEvaluator._compiled_evaluable_code
+        assert 'doors_open = False' in PythonEvaluator._compiled_executable_code
+
+    def test_execution_without_compile(self, elevator, mocker):
+        statechart = import_from_bundle(export_to_bundle(elevator.statechart))
+        interpreter = Interpreter(statechart)
+
+        spy = mocker.spy(builtins, 'compile')
+        for i in (interpreter, elevator):
+            i.queue('floorSelected', floor=4).execute()
+        assert spy.call_count == 0
+        assert interpreter.context == elevator.context
+
+    def test_other_python_version(self, elevator, mocker):
+        mocker.patch('importlib.util.MAGIC_NUMBER', b'\x00\x00\r\n')
+        data = export_to_bundle(elevator.statechart)
+        mocker.stopall()
+
+        compare_statecharts(elevator.statechart, import_from_bundle(data))
+        assert len(PythonEvaluator._compiled_executable_code) == 0
+
+    def test_filepath(self, elevator, tmpdir):
+        filepath = str(tmpdir.join('elevator.bundle'))
+        export_to_bundle(elevator.statechart, filepath)
+        compare_statecharts(elevator.statechart, import_from_bundle(filepath=filepath))
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            import_from_bundle(b'invalid')
+        with pytest.raises(TypeError):
+            import_from_bundle()
+
 
 class TestExportToPlantUML:
     def test_export_example_from_tests(self, example_from_tests):
@@ -152,6 +406,64 @@ class TestExportToPlantUML:
         assert p1 == export_to_plantuml(statechart, based_on=p1)
         assert p1 == export_to_plantuml(statechart, based_on_filepath=filepath)
 
+    def test_repeated_export(self, elevator):
+        statechart = elevator.statechart
+        exporter = PlantUMLExporter(statechart)
+
+        export = exporter.export()
+        assert export == PlantUMLExporter(statechart).export()
+        assert export == exporter.export()
+
+    def test_export_after_changes(self, elevator, mocker):
+        statechart = elevator.statechart
+        exporter = PlantUMLExporter(statechart)
+        exporter.export()
+
+        statechart.state_for('doorsOpen').on_entry = 'x = 1'
+        statechart.add_transition(Transition('doorsClosed', 'doorsOpen', event='open'))
+
+        mocker.spy(exporter, 'export_state_content')
+        export = exporter.export()
+        assert export == PlantUMLExporter(statechart).export()
+        # Only the lines of the changed states are generated again
+        calls = [call[0][0] for call in exporter.export_state_content.call_args_list]
+        assert sorted(calls) == ['doorsClosed', 'doorsOpen']
+
+    def test_export_after_edits(self, elevator):
+        statechart = elevator.statechart
+        exporter = PlantUMLExporter(statechart, statechart_description=False, statechart_preamble=False,
+                                    state_contracts=False, transition_contracts=False)
+        exporter.export()
+
+        statechart.rename_state('doorsOpen', 'opened')
+        statechart.state_for('movingUp').invariants.append('current < 10')
+        statechart.remove_transition(statechart.transitions_from('movingDown')[0])
+        assert exporter.export() == export_to_plantuml(statechart)
+
+        exporter.configuration = ['active', 'floorListener', 'movingElevator', 'opened']
+        exporter.state_contracts = True
+        assert exporter.export() == export_to_plantuml(statechart, configuration=exporter.configuration,
+                                                       state_contracts=True)
+
+
+    def test_export_runtime(self, elevator):
+        trace = log_trace(elevator)
+        elevator.queue('floorSelected', floor=4)
+        elevator.execute()
+
+        export = export_to_plantuml(
+            elevator.statechart, configuration=elevator.configuration, coverage=coverage_from_trace(trace))
+
+        assert 'state "doorsOpen" as doorsOpen #FF8080 ##[bold]blue {' in export
+        assert 'state "movingUp" as movingUp #FF0000 {' in export
+        assert 'state "movingDown" as movingDown {' in export
+        assert 'movingUp -[#FF0000]-> movingUp' in export
+        assert 'doorsClosed --> movingDown' in export
+
+    def test_heat_color(self):
+        assert PlantUMLExporter.heat_color(0, 10) == '#FFFFFF'
+        assert PlantUMLExporter.heat_color(5, 10) == '#FF8080'
+        assert PlantUMLExporter.heat_color(10, 10) == '#FF0000'
 
     def test_cli(self, capsys):
         filepath = 'docs/examples/elevator/elevator.yaml'
@@ -1,8 +1,13 @@
+import copy
+import pickle
 import pytest
 
+from collections import Counter
+
 from sismic.exceptions import StatechartError
 from sismic.model import Statechart, Transition, CompoundState, BasicState
 from sismic.interpreter import Event
+from sismic.io import import_from_yaml
 
 
 class TestEvents:
@@ -37,6 +42,64 @@ class TestEvents:
             Event('test', name='fail')
 
 
+class TestElements:
+    def test_no_instance_dict(self):
+        for element in [BasicState('s'), CompoundState('s'), Transition('s')]:
+            assert not hasattr(element, '__dict__')
+
+    def test_empty_contract(self):
+        s1, s2 = BasicState('s1'), BasicState('s2')
+        assert s1._preconditions is s2._preconditions
+        assert s1.preconditions == []
+
+        conditions = s1.preconditions
+        conditions.append('x > 0')
+        conditions.append('y > 0')
+        s1.invariants += ['z > 0']
+        assert s1.preconditions == ['x > 0', 'y > 0']
+        assert s1.invariants == ['z > 0']
+        assert s2.preconditions == s2.invariants == []
+
+    def test_contract_lists_are_kept(self):
+        state = BasicState('s')
+        a, b = state.invariants, state.invariants
+        a.append('x > 0')
+        b.append('y > 0')
+        assert a == b == state.invariants == ['x > 0', 'y > 0']
+        state.invariants.append('z > 0')
+        assert a == b == ['x > 0', 'y > 0', 'z > 0']
+
+        preconditions = state.preconditions
+        state.preconditions.append('x > 0')
+        assert preconditions == ['x > 0']
+
+    def test_reading_contract_does_not_create_lists(self):
+        s1, s2 = BasicState('s1'), BasicState('s2')
+        assert list(s1.preconditions) == [] and len(s1.postconditions) == 0 and s1.invariants == []
+        assert tuple(s1.invariants) == () and not any(True for _ in s1.invariants)
+        assert s1 == BasicState('s1')
+        assert s1._preconditions is s1._postconditions is s1._invariants is s2._invariants
+
+    def test_pickle_and_copy(self):
+        transition = Transition('s1', 's2', event='e')
+        transition.postconditions.append('x > 0')
+        for other in [pickle.loads(pickle.dumps(transition)), copy.deepcopy(transition)]:
+            assert other == transition
+            assert other.postconditions == ['x > 0']
+            assert type(other.postconditions) is list
+            other.preconditions.append('y > 0')
+            assert other.preconditions == ['y > 0']
+
+    def test_deepcopy(self):
+        state = CompoundState('s', initial='a', on_entry='x = 1')
+        state.invariants.append('x > 0')
+        state_copy = copy.deepcopy(state)
+        assert (state_copy.name, state_copy.initial, state_copy.on_entry) == ('s', 'a', 'x = 1')
+        assert state_copy.invariants == ['x > 0']
+        assert state_copy.invariants is not state.invariants
+        assert state_copy._preconditions is state._preconditions
+
+
 class TestStatechartTraveral:
     def test_parent(self, composite_statechart):
         assert composite_statechart.parent_for('s2') == 'root'
@@ -84,6 +147,15 @@ class TestStatechartTraveral:
         assert set(composite_statechart.events_for('s1b1')) == {'validate'}
         assert set(composite_statechart.events_for(['s1b1', 's1b'])) == {'click', 'validate'}
 
+    def test_index_for(self, composite_statechart):
+        for i, name in enumerate(composite_statechart.states):
+            assert composite_statechart.index_for(name) == i
+
+        composite_statechart.rename_state('s2', 'a')
+        assert composite_statechart.index_for('a') == 0
+        with pytest.raises(StatechartError):
+            composite_statechart.index_for('s2')
+
     def test_name_collision(self):
         root = CompoundState('root', 'a')
         sc = Statechart('test')
@@ -164,6 +236,19 @@ class TestTransition:
             internal_statechart.transitions_from('unknown')
         assert 'does not exist' in str(e.value)
 
+    def test_outgoing_transitions_for(self, internal_statechart):
+        for name in internal_statechart.states:
+            assert list(internal_statechart.outgoing_transitions_for(name)) == internal_statechart.transitions_from(name)
+
+        transitions = internal_statechart.outgoing_transitions_for('s1')
+        transition = Transition('s1', 's2', event='e')
+        internal_statechart.add_transition(transition)
+        assert transitions[-1] is transition
+
+        with pytest.raises(StatechartError) as e:
+            internal_statechart.outgoing_transitions_for('unknown')
+        assert 'does not exist' in str(e.value)
+
     def test_transitions_to(self, internal_statechart):
         assert internal_statechart.transitions_to('root') == []
         assert len(internal_statechart.transitions_to('s1')) == 1
@@ -273,6 +358,42 @@ class TestTransition:
         assert internal_statechart.transitions == []
         internal_statechart.validate()
 
+    def test_transition_ids(self, internal_statechart):
+        ids = [transition.id for transition in internal_statechart.transitions]
+        assert ids == list(range(len(ids)))
+
+        transition = Transition('s1', 's2')
+        assert transition.id is None
+        internal_statechart.add_transition(transition)
+        assert transition.id == len(ids)
+
+        internal_statechart.remove_transition(transition)
+        other = Transition('s1', 's2')
+        internal_statechart.add_transition(other)
+        assert other.id == len(ids) + 1
+
+    def test_order_after_removals(self, internal_statechart):
+        transitions = internal_statechart.transitions
+        for transition in transitions[::2]:
+            internal_statechart.remove_transition(transition)
+        internal_statechart.remove_state('s2')
+
+        expected = [t for t in transitions[1::2] if 's2' not in (t.source, t.target)]
+        assert [t.id for t in internal_statechart.transitions] == [t.id for t in expected]
+        internal_statechart.validate()
+
+    def test_equality_and_hash(self):
+        t1, t2 = Transition('s1', 's2', event='e'), Transition('s1', 's2', event='e')
+        t3 = Transition('s1', 's3', event='e')
+        t2._id = 42
+        assert t1 == t2 and hash(t1) == hash(t2)
+        assert t1 != t3 and hash(t1) != hash(t3)
+
+    def test_hash_of_transitions_with_same_event(self):
+        transitions = [Transition('s{}'.format(i), 's{}'.format(i + 1), event='next') for i in range(100)]
+        assert len({hash(transition) for transition in transitions}) == 100
+        assert Counter(transitions) == Counter({transition: 1 for transition in transitions})
+
     def test_remove_unexisting_transition(self, internal_statechart):
         with pytest.raises(StatechartError) as e:
             internal_statechart.remove_transition(None)
@@ -499,6 +620,58 @@ class TestStatechartStates:
         assert history_statechart.state_for('loop.H').memory is None
         history_statechart.validate()
 
+    def test_remove_keeps_other_initial(self, composite_statechart):
+        composite_statechart.remove_state('s1b1')
+        assert composite_statechart.state_for('s1b').initial is None
+        assert composite_statechart.state_for('s1').initial == 's1a'
+        assert composite_statechart.state_for('root').initial == 's1'
+
+    @pytest.mark.parametrize('change', [
+        lambda sc: sc.remove_state('s1b'),
+        lambda sc: sc.remove_state('s1'),
+        lambda sc: sc.rename_state('s1b', 'new s1b'),
+        lambda sc: sc.rename_state('s1', 'new s1'),
+        lambda sc: sc.move_state('s1b', 'root'),
+        lambda sc: sc.add_transition(Transition('s1b1', 's1a')),
+        lambda sc: sc.remove_transition(sc.transitions_from('s1a')[0]),
+        lambda sc: sc.rotate_transition(sc.transitions_from('s1a')[0], new_source='s1b1', new_target='s1'),
+        lambda sc: sc.rotate_transition(sc.transitions_from('s1a')[0], new_target=None),
+    ])
+    def test_transitions_by_state(self, composite_statechart, change):
+        composite_statechart.add_transition(Transition('s1b', 's1b'))
+        composite_statechart.add_transition(Transition('s1b1'))
+        change(composite_statechart)
+
+        transitions = composite_statechart.transitions
+        for name in composite_statechart.states:
+            assert composite_statechart._transitions_from[name] == [t for t in transitions if t.source == name]
+            assert composite_statechart._transitions_to[name] == [t for t in transitions if t.target == name]
+        assert set(composite_statechart._transitions_from) == set(composite_statechart.states)
+        assert set(composite_statechart._transitions_to) == set(composite_statechart.states)
+        for event in [None, 'click', 'close', 'validate']:
+            assert composite_statechart.transitions_with(event) == [t for t in transitions if t.event == event]
+        assert composite_statechart.events_for() == sorted({t.event for t in transitions if t.event})
+
+    def test_queries(self, example_from_tests):
+        statechart = example_from_tests
+        transitions = statechart.transitions
+        for name in statechart.states:
+            assert statechart.transitions_from(name) == [t for t in transitions if t.source == name]
+            assert statechart.transitions_to(name) == [
+                t for t in transitions if t.target == name or (t.internal and t.source == name)]
+            assert statechart.events_for(name) == sorted({t.event for t in transitions if t.source == name and t.event})
+        for event in statechart.events_for() + [None, 'unknown']:
+            assert statechart.transitions_with(event) == [t for t in transitions if t.event == event]
+        assert statechart.events_for() == statechart.events_for(statechart.states)
+
+    def test_events_cache(self, composite_statechart):
+        assert composite_statechart.events_for() == ['click', 'close', 'validate']
+        composite_statechart.add_transition(Transition('s1a', 's1b', event='tap'))
+        assert composite_statechart.events_for() == ['click', 'close', 'tap', 'validate']
+        composite_statechart.remove_state('s1')
+        assert composite_statechart.events_for() == []
+        assert composite_statechart.transitions_with('click') == []
+
 
 class TestCopyFromStatechart:
     @pytest.fixture
@@ -583,3 +756,192 @@ class TestCopyFromStatechart:
         with pytest.raises(StatechartError) as e:
             composite_statechart.copy_from_statechart(modified_simple_statechart, source='sc1_root', replace='s1a')
         assert 'already exists' in str(e.value)
+
+    def test_unchanged_on_error(self, modified_simple_statechart, composite_statechart):
+        states, transitions = composite_statechart.states, composite_statechart.transitions
+        with pytest.raises(StatechartError, match='not contained in'):
+            composite_statechart.copy_from_statechart(modified_simple_statechart, source='sc1_s1', replace='s1b1',
+                                                      renaming_func=lambda s: 'copy_' + s)
+        assert composite_statechart.states == states
+        assert composite_statechart.transitions == transitions
+
+    def test_elements_are_copied(self, modified_simple_statechart, composite_statechart):
+        fingerprint = modified_simple_statechart.fingerprint()
+        composite_statechart.copy_from_statechart(modified_simple_statechart, source='sc1_root', replace='s1a')
+
+        for name in modified_simple_statechart.states:
+            if name != 'sc1_root':
+                assert composite_statechart.state_for(name) is not modified_simple_statechart.state_for(name)
+        for transition in modified_simple_statechart.transitions:
+            assert all(t is not transition for t in composite_statechart.transitions)
+        assert modified_simple_statechart.fingerprint() == fingerprint
+        assert modified_simple_statechart.state_for('sc1_root').name == 'sc1_root'
+
+    def test_internal_transitions(self, internal_statechart, composite_statechart):
+        internal_statechart.add_transition(Transition('s1', event='tick'))
+        composite_statechart.copy_from_statechart(internal_statechart, source='root', replace='s1a',
+                                                  renaming_func=lambda s: 'copy_' + s)
+
+        transition = composite_statechart.transitions_from('copy_s1')[-1]
+        assert transition.event == 'tick'
+        assert transition.internal
+        assert composite_statechart.state_for('s1a').initial == 'copy_active'
+        composite_statechart.validate()
+
+
+class TestFromElements:
+    def elements_for(self, statechart):
+        states = [statechart.state_for(name) for name in statechart.states]
+        parents = {name: statechart.parent_for(name) for name in statechart.states}
+        return states, parents, statechart.transitions
+
+    def test_same_statechart(self, composite_statechart):
+        statechart = Statechart.from_elements('copy', *self.elements_for(composite_statechart), preamble='x = 1')
+
+        assert statechart.name == 'copy'
+        assert statechart.preamble == 'x = 1'
+        assert statechart.root == composite_statechart.root
+        assert statechart.transitions == composite_statechart.transitions
+        for name in composite_statechart.states:
+            assert statechart.parent_for(name) == composite_statechart.parent_for(name)
+            assert set(statechart.children_for(name)) == set(composite_statechart.children_for(name))
+        assert statechart.validate()
+
+    def test_any_order(self):
+        statechart = Statechart.from_elements(
+            'test',
+            [BasicState('s2'), BasicState('s1'), CompoundState('root', initial='s1')],
+            {'s1': 'root', 's2': 'root', 'root': None},
+            [Transition('s1', 's2')],
+        )
+        assert statechart.children_for('root') == ['s2', 's1']
+
+    def test_all_errors_are_reported(self):
+        with pytest.raises(StatechartError) as e:
+            Statechart.from_elements(
+                'test',
+                [CompoundState('root'), BasicState('s1'), BasicState('s1'), BasicState('s2'),
+                 BasicState('s3'), CompoundState('other root')],
+                {'root': None, 's1': 'root', 's2': 's1', 's3': 'unknown', 'other root': None, 's4': 'root'},
+                [Transition('s1', 'unknown'), Transition('unknown', 's1')],
+            )
+
+        errors = str(e.value).split('\n')
+        assert len(errors) == 7
+        assert 'already exists' in errors[0]
+        assert 'unknown state s4' in errors[1]
+        assert 'cannot be used as a parent' in errors[2]
+        assert 'Parent "unknown"' in errors[3]
+        assert 'Root already defined' in errors[4]
+        assert 'Unknown target state' in errors[5]
+        assert 'Unknown source state' in errors[6]
+
+    def test_cycle(self):
+        with pytest.raises(StatechartError, match='not a descendant of the root state'):
+            Statechart.from_elements(
+                'test',
+                [CompoundState('root'), CompoundState('s1'), CompoundState('s2')],
+                {'root': None, 's1': 's2', 's2': 's1'},
+                [],
+            )
+
+    def test_undeclared_parent(self):
+        with pytest.raises(StatechartError, match='Parent of .* is not declared'):
+            Statechart.from_elements('test', [CompoundState('root'), BasicState('s1')], {'root': None}, [])
+
+
+class TestFingerprint:
+    def test_deterministic(self, composite_statechart):
+        assert composite_statechart.fingerprint() == composite_statechart.fingerprint()
+        assert composite_statechart.fingerprint() == import_from_yaml(filepath='tests/yaml/composite.yaml').fingerprint()
+        assert composite_statechart.fingerprint() != import_from_yaml(filepath='tests/yaml/simple.yaml').fingerprint()
+
+    def test_independent_of_order(self, composite_statechart):
+        states = [composite_statechart.state_for(name) for name in reversed(composite_statechart.states)]
+        parents = {name: composite_statechart.parent_for(name) for name in composite_statechart.states}
+        transitions = list(reversed(composite_statechart.transitions))
+        statechart = Statechart.from_elements('other name', states, parents, transitions)
+        assert statechart.fingerprint() == composite_statechart.fingerprint()
+
+    def test_memoized(self, composite_statechart):
+        fingerprint = composite_statechart.fingerprint()
+        composite_statechart.state_for('s2').on_entry = 'x = 1'
+        assert composite_statechart.fingerprint() == fingerprint
+
+    @pytest.mark.parametrize('change', [
+        lambda sc: sc.add_state(BasicState('s3'), 'root'),
+        lambda sc: sc.remove_state('s2'),
+        lambda sc: sc.rename_state('s2', 's3'),
+        lambda sc: sc.move_state('s2', 's1'),
+        lambda sc: sc.add_transition(Transition('s1', 's1')),
+        lambda sc: sc.remove_transition(sc.transitions_from('s1')[0]),
+        lambda sc: sc.rotate_transition(sc.transitions_from('s1')[0], new_target='s1'),
+    ])
+    def test_invalidated(self, composite_statechart, change):
+        fingerprint = composite_statechart.fingerprint()
+        change(composite_statechart)
+        assert composite_statechart.fingerprint() != fingerprint
+
+    def test_invalidated_by_copy(self, composite_statechart):
+        fingerprint = composite_statechart.fingerprint()
+        composite_statechart.copy_from_statechart(
+            import_from_yaml(filepath='tests/yaml/simple.yaml'), source='root', replace='s1a',
+            renaming_func=lambda name: 'copy_' + name)
+        assert composite_statechart.fingerprint() != fingerprint
+
+
+class TestFreeze:
+    @pytest.fixture()
+    def frozen(self, composite_statechart):
+        return composite_statechart.freeze()
+
+    def test_frozen_copy(self, composite_statechart, frozen):
+        assert not composite_statechart.frozen
+        assert frozen.frozen
+        assert frozen is not composite_statechart
+        assert frozen.freeze() is frozen
+        assert frozen.fingerprint() == composite_statechart.fingerprint()
+
+    def test_lookups(self, example_from_tests):
+        frozen = example_from_tests.freeze()
+        for name in example_from_tests.states:
+            assert frozen.ancestors_for(name) == example_from_tests.ancestors_for(name)
+            assert frozen.descendants_for(name) == example_from_tests.descendants_for(name)
+            assert frozen.depth_for(name) == example_from_tests.depth_for(name)
+            assert frozen.transitions_from(name) == example_from_tests.transitions_from(name)
+
+        with pytest.raises(StatechartError, match='does not exist'):
+            frozen.ancestors_for('unknown')
+
+    @pytest.mark.parametrize('change', [
+        lambda sc: sc.add_state(BasicState('s3'), 'root'),
+        lambda sc: sc.remove_state('s2'),
+        lambda sc: sc.rename_state('s2', 's3'),
+        lambda sc: sc.move_state('s2', 's1'),
+        lambda sc: sc.add_transition(Transition('s1', 's1')),
+        lambda sc: sc.remove_transition(sc.transitions_from('s1')[0]),
+        lambda sc: sc.rotate_transition(sc.transitions_from('s1')[0], new_target='s1'),
+        lambda sc: sc.copy_from_statechart(import_from_yaml(filepath='tests/yaml/simple.yaml'),
+                                           source='root', replace='s1a', renaming_func=lambda name: 'copy_' + name),
+    ])
+    def test_cannot_be_modified(self, frozen, change):
+        fingerprint = frozen.fingerprint()
+        with pytest.raises(StatechartError, match='is frozen'):
+            change(frozen)
+        assert frozen.fingerprint() == fingerprint
+
+    def test_independent_of_original(self, composite_statechart, frozen):
+        composite_statechart.add_state(BasicState('s3'), 'root')
+        assert 's3' not in frozen.states
+
+    def test_copy_from_frozen(self, composite_statechart):
+        frozen = import_from_yaml(filepath='tests/yaml/simple.yaml').freeze()
+        composite_statechart.copy_from_statechart(frozen, source='root', replace='s1a',
+                                                  renaming_func=lambda name: 'copy_' + name)
+        assert 'copy_s1' in composite_statechart.states
+        assert frozen.frozen
+
+    def test_invalid(self, composite_statechart):
+        composite_statechart.state_for('root').initial = 'unknown'
+        with pytest.raises(StatechartError, match='does not exist'):
+            composite_statechart.freeze()
@@ -0,0 +1,132 @@
+import pytest
+
+from sismic.code import DummyEvaluator
+from sismic.interpreter import Interpreter
+from sismic.store import SnapshotStore
+
+
+@pytest.fixture()
+def path(tmpdir):
+    return str(tmpdir.join('sessions.store'))
+
+
+@pytest.fixture()
+def interpreters(elevator):
+    interpreters = {}
+    for floor in range(1, 4):
+        interpreter = Interpreter(elevator.statechart)
+        interpreter.execute()
+        interpreter.queue('floorSelected', floor=floor).execute()
+        interpreters['session-{}'.format(floor)] = interpreter
+    return interpreters
+
+
+class TestSnapshotStore:
+    def test_empty(self, path, elevator):
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert len(store) == 0
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert len(store) == 0
+            with pytest.raises(KeyError):
+                store.get('unknown')
+
+    def test_put_and_get(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+            assert store.get('session-2') is interpreters['session-2']
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert set(store) == set(interpreters)
+            for session, interpreter in interpreters.items():
+                assert session in store
+                assert store[session].configuration == interpreter.configuration
+                assert store[session].context == interpreter.context
+
+    def test_lazy_restore(self, path, elevator, interpreters, mocker):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+
+        spy = mocker.spy(Interpreter, 'restore')
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert spy.call_count == 0
+            assert store.get('session-1') is store.get('session-1')
+            assert spy.call_count == 1
+
+    def test_latest_record_wins(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+            interpreters['session-1'].queue('floorSelected', floor=4).execute()
+            store.checkpoint(release=True)
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert store.get('session-1').context['current'] == 4
+
+    def test_snapshots(self, path, elevator, interpreters):
+        snapshot = interpreters['session-3'].snapshot()
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put('session', snapshot)
+            assert store.snapshot_for('session') == snapshot
+            assert store.get('session').context['current'] == 3
+
+    def test_remove(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+            store.remove('session-1')
+            assert 'session-1' not in store
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert set(store) == {'session-2', 'session-3'}
+
+    def test_compact(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            for _ in range(5):
+                store.put_many(interpreters.items())
+            store.remove('session-1')
+
+            size = len(open(path, 'rb').read())
+            store.compact()
+            assert len(open(path, 'rb').read()) < size / 5
+            assert set(store) == {'session-2', 'session-3'}
+            assert store.get('session-3').context['current'] == 3
+
+    def test_truncated_record(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+        size = len(open(path, 'rb').read())
+        with open(path, 'ab') as f:
+            f.write(b'\x05\x00')
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert len(store) == 3
+            store.put('session-4', interpreters['session-1'])
+
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert len(store) == 4
+            assert len(open(path, 'rb').read()) > size
+
+    def test_restore_parameters(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+
+        with SnapshotStore(path, elevator.statechart, evaluator_klass=DummyEvaluator) as store:
+            assert isinstance(store.get('session-1')._evaluator, DummyEvaluator)
+
+    def test_invalid_file(self, path, elevator):
+        with open(path, 'wb') as f:
+            f.write(b'not a store')
+
+        with pytest.raises(ValueError):
+            SnapshotStore(path, elevator.statechart)
+
+    def test_other_statechart(self, path, elevator, interpreters):
+        with SnapshotStore(path, elevator.statechart) as store:
+            store.put_many(interpreters.items())
+
+        elevator.statechart.rename_state('doorsOpen', 'opened')
+        with pytest.raises(ValueError, match='not created for'):
+            SnapshotStore(path, elevator.statechart)
+
+        elevator.statechart.rename_state('opened', 'doorsOpen')
+        with SnapshotStore(path, elevator.statechart) as store:
+            assert store.get('session-1').configuration == interpreters['session-1'].configuration